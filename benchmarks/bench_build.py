@@ -0,0 +1,145 @@
+"""
+End-to-end build benchmark. Generates a synthetic corpus and times a cold
+build, a no-op rebuild, a single post edit and a template edit through the
+Blog API. Run it from the repository root:
+
+    python -m benchmarks.bench_build --posts 2000 --output results.json
+
+Exits with status 1 if a scenario is slower than its threshold in
+--thresholds (seconds of wall time) or regressed by more than --tolerance
+compared to a --baseline results file.
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter, process_time
+
+from benchmarks.corpus import add_corpus_arguments, generate_corpus, spec_from_args
+from blogger.blog import Blog
+from blogger.conf import BlogConfig
+from blogger.profiling import peak_rss
+from blogger.templates import TEMPLATES_PATH, Templates
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+SCENARIOS = ["cold", "noop", "single_post_edit", "template_edit"]
+
+
+def run_build(config: BlogConfig) -> dict:
+    # the peak is that of the whole process, only its growth belongs to this build
+    peak = peak_rss()
+    wall, cpu = perf_counter(), process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        blog = Blog(config=config)
+        blog.update()
+    wall, cpu = perf_counter() - wall, process_time() - cpu
+    return {
+        "wall": wall,
+        "cpu": cpu,
+        "peak_rss_growth": peak and peak_rss() - peak,
+        "written": blog.output.written,
+        "unchanged": blog.output.skipped,
+    }
+
+
+def run_scenarios(work_path: Path, config: BlogConfig) -> dict:
+    results = {}
+    results["cold"] = run_build(config)
+    results["noop"] = run_build(config)
+
+    post = sorted(config.blog_in_path.glob("*.md"))[0]
+    with post.open("a") as f:
+        f.write("\nAn edit to a single post.\n")
+    results["single_post_edit"] = run_build(config)
+
+    with (work_path / TEMPLATES_PATH / "post.html").open("a") as f:
+        f.write("<!-- template edit -->\n")
+    Templates.clear_cache()
+    results["template_edit"] = run_build(config)
+    return results
+
+
+def check_regressions(
+    results: dict, thresholds: dict, baseline: dict, tolerance: float
+) -> list:
+    failures = []
+    for scenario, result in results.items():
+        limit = thresholds.get(scenario)
+        if limit is not None and result["wall"] > limit:
+            failures.append(f"{scenario}: {result['wall']:.3f}s > threshold {limit:.3f}s")
+        previous = baseline.get(scenario)
+        if previous is not None and result["wall"] > previous["wall"] * (1 + tolerance):
+            failures.append(
+                f"{scenario}: {result['wall']:.3f}s > baseline "
+                f"{previous['wall']:.3f}s + {tolerance:.0%}"
+            )
+    return failures
+
+
+def main():
+    parser = ArgumentParser()
+    add_corpus_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--output", type=Path, help="Write results as json.")
+    parser.add_argument(
+        "--thresholds",
+        type=Path,
+        help="Json file mapping scenario names to the maximum wall time in seconds.",
+    )
+    parser.add_argument("--baseline", type=Path, help="Results of an earlier run.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    work_path = Path(tempfile.mkdtemp(prefix="blogger-bench-"))
+    cwd = os.getcwd()
+    try:
+        shutil.copytree(REPO_PATH / TEMPLATES_PATH, work_path / TEMPLATES_PATH)
+        generate_corpus(work_path / "in", spec)
+        config = BlogConfig.from_dict(
+            {
+                "blog_in_path": work_path / "in",
+                "blog_out_path": work_path / "out",
+                "tags_path": "tags",
+                "posts_path": "posts",
+                "blog_index_path": work_path / "out" / "blog_index.json",
+                "workers": args.workers,
+                "use_cache": not args.no_cache,
+            }
+        )
+        # templates and the render cache are resolved relative to the working directory
+        os.chdir(work_path)
+        Templates.clear_cache()
+        results = run_scenarios(work_path, config)
+    finally:
+        os.chdir(cwd)
+        Templates.clear_cache()
+        shutil.rmtree(work_path)
+
+    for scenario in SCENARIOS:
+        result = results[scenario]
+        print(
+            f"{scenario:<20} {result['wall']:>9.3f}s wall {result['cpu']:>9.3f}s cpu "
+            f"{result['written']:>7} written"
+        )
+
+    report = {"corpus": spec.to_json(), "workers": args.workers, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    thresholds = json.loads(args.thresholds.read_text()) if args.thresholds else {}
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline else {}
+    failures = check_regressions(results, thresholds, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
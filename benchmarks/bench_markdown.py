@@ -0,0 +1,146 @@
+"""
+Markdown conversion microbenchmark on code heavy posts. Compares the
+placeholders markdown2 used to derive from sha256 with the per conversion
+counter placeholders, a new converter per post with the reused converters
+of render_markdown, looking up a pygments lexer and creating a formatter per
+code block with the shared ones, and highlighting every code block with a
+warm highlight cache. Run it from the repository root:
+
+    python -m benchmarks.bench_markdown --posts 20 --code-spans 500
+"""
+import random
+import tempfile
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+from benchmarks.corpus import SNIPPETS, WORDS
+from blogger import markdown2
+from blogger.cache import DiskCache
+from blogger.render import render_markdown, use_highlight_cache
+from blogger.utils import MARKDOWN_EXTRAS
+
+
+def code_heavy_post(rnd: random.Random, code_spans: int, code_blocks: int) -> str:
+    lines = []
+    for i in range(code_spans):
+        word = rnd.choice(WORDS)
+        lines.append(f"Call `{word}_{i}(*args)` or `{word} < {i}` with **{word}**.")
+        if i % 10 == 9:
+            lines.append("")
+    for _ in range(code_blocks):
+        lexer = rnd.choice(list(SNIPPETS))
+        lines.append(f"\n```{lexer}\n{SNIPPETS[lexer]}\n```\n")
+    return "\n".join(lines)
+
+
+@contextmanager
+def sha256_placeholders():
+    """Makes markdown2 hash every placeholder with sha256 like it used to."""
+    counter_hash_text = markdown2.Markdown._hash_text
+    markdown2.Markdown._hash_text = lambda self, s: markdown2._hash_text(s)
+    try:
+        yield
+    finally:
+        markdown2.Markdown._hash_text = counter_hash_text
+
+
+@contextmanager
+def uncached_pygments():
+    """Makes markdown2 build a lexer and formatter for every code block."""
+    cached = {
+        name: getattr(markdown2, name)
+        for name in (
+            "_pygments_lexer",
+            "_html_code_formatter_class",
+            "_pygments_formatter",
+        )
+    }
+    for name, memoized in cached.items():
+        setattr(markdown2, name, memoized.func)
+    try:
+        yield
+    finally:
+        for name, memoized in cached.items():
+            setattr(markdown2, name, memoized)
+
+
+def new_converter(post: str) -> str:
+    return markdown2.markdown(post, extras=MARKDOWN_EXTRAS)
+
+
+def convert_all(
+    posts: list, repeat: int, convert: Callable = new_converter
+) -> tuple:
+    """Returns the best wall time of converting all posts and the html."""
+    best, html = float("inf"), []
+    for _ in range(repeat):
+        start = perf_counter()
+        html = [convert(post) for post in posts]
+        best = min(best, perf_counter() - start)
+    return best, html
+
+
+def compare(name: str, baseline: tuple, candidate: tuple):
+    if baseline[1] != candidate[1]:
+        raise SystemExit(f"{name}: both variants must produce the same html")
+    print(
+        f"{name:<24} {baseline[0]:>9.3f}s {candidate[0]:>9.3f}s "
+        f"{baseline[0] / candidate[0]:>9.1f}x"
+    )
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--code-spans", type=int, default=500)
+    parser.add_argument("--code-blocks", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    posts = [
+        code_heavy_post(rnd, args.code_spans, args.code_blocks)
+        for _ in range(args.posts)
+    ]
+
+    print(f"{'':<24} {'before':>10} {'after':>10} {'speedup':>9}")
+    with sha256_placeholders():
+        sha256 = convert_all(posts, args.repeat)
+    counter = convert_all(posts, args.repeat)
+    compare("placeholders", sha256, counter)
+
+    # single paragraph posts, where setting up a converter weighs most
+    small_posts = [post.split("\n", 1)[0] for post in posts] * 100
+    compare(
+        "reused converters",
+        convert_all(small_posts, args.repeat),
+        convert_all(small_posts, args.repeat, render_markdown),
+    )
+
+    # posts of short snippets, where the per block setup weighs most
+    snippet_posts = [
+        code_heavy_post(rnd, 0, args.code_blocks * 10) for _ in range(args.posts)
+    ]
+    with uncached_pygments():
+        uncached = convert_all(snippet_posts, args.repeat, render_markdown)
+    compare(
+        "pygments caches",
+        uncached,
+        convert_all(snippet_posts, args.repeat, render_markdown),
+    )
+
+    with tempfile.TemporaryDirectory() as cache_path:
+        uncached = convert_all(snippet_posts, args.repeat, render_markdown)
+        use_highlight_cache(DiskCache(Path(cache_path), 64 * 1024 * 1024))
+        # the first of the repeats fills the cache
+        cached = convert_all(snippet_posts, args.repeat + 1, render_markdown)
+        use_highlight_cache(None)
+    compare("highlight cache", uncached, cached)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Memory benchmark of the in-memory post representation. Creates posts the way
+a build does, from frontmatter when a post is scanned and from index records
+when it is accessed, and reports the memory they take next to the memory of
+a blog index loaded from disk. Run it from the
+repository root:
+
+    python -m benchmarks.bench_memory --posts 100000
+"""
+import gc
+import random
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from pathlib import Path
+
+from frontmatter import Post
+
+from blogger.blog_index import BlogIndex
+from blogger.blogpost import BlogPost
+from blogger.constants import (
+    BLOG_AUTHOR_KEY,
+    BLOG_PUBLISHED_KEY,
+    BLOG_SUBTITLE_KEY,
+    BLOG_TAGS_KEY,
+    BLOG_TITLE_KEY,
+)
+
+
+def post_meta(rnd: random.Random, i: int, tags: int, tags_per_post: int) -> Post:
+    day = date(2015, 1, 1) + timedelta(days=rnd.randint(0, 3650))
+    return Post(
+        "",
+        **{
+            BLOG_TITLE_KEY: f"Synthetic post {i}",
+            BLOG_SUBTITLE_KEY: f"About post {i}",
+            BLOG_AUTHOR_KEY: "Bench Author",
+            BLOG_PUBLISHED_KEY: day,
+            BLOG_TAGS_KEY: rnd.sample([f"tag {n}" for n in range(tags)], tags_per_post),
+        },
+    )
+
+
+def measure(create) -> tuple:
+    """Returns what create returns and the memory it still holds in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = create()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--tags-per-post", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    metas = [
+        post_meta(rnd, i, args.tags, args.tags_per_post) for i in range(args.posts)
+    ]
+    files = [Path(f"in/post-{i:06d}.md") for i in range(args.posts)]
+
+    scanned, scanned_size = measure(
+        lambda: [
+            BlogPost(meta, file, mtime=0) for meta, file in zip(metas, files)
+        ]
+    )
+    records = [post.to_json() for post in scanned]
+    del scanned, metas
+    loaded, loaded_size = measure(lambda: [BlogPost.from_json(data) for data in records])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        blog_index = BlogIndex(Path(tmp) / "blog_index.json")
+        for post in loaded:
+            blog_index.add_post(post)
+        blog_index.to_json()
+        del blog_index
+        blog_index, index_size = measure(
+            lambda: BlogIndex.from_json(Path(tmp) / "blog_index.json")
+        )
+    tags = {id(tag) for post in loaded for tag in post.tags}
+
+    print(f"{'posts':<28} {args.posts:>12}")
+    print(f"{'tag objects':<28} {len(tags):>12}")
+    for name, size in [
+        ("scanned posts", scanned_size),
+        ("loaded posts", loaded_size),
+        ("loaded index", index_size),
+    ]:
+        print(
+            f"{name:<28} {size / 2**20:>9.1f} MB {size / args.posts:>9.0f} B/post"
+        )
+    return blog_index
+
+
+if __name__ == "__main__":
+    main()
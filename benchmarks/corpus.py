@@ -0,0 +1,197 @@
+"""
+Generates a synthetic blog_in_path for benchmarking.
+
+    python -m benchmarks.corpus <path> --posts 1000
+"""
+import random
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from pathlib import Path
+
+from blogger.constants import (
+    BLOG_ARCHIVED_KEY,
+    BLOG_AUTHOR_KEY,
+    BLOG_DATE_KEY,
+    BLOG_PUBLISHED_KEY,
+    BLOG_SUBTITLE_KEY,
+    BLOG_TAGS_KEY,
+    BLOG_TITLE_KEY,
+)
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog data model python markdown blog "
+    "index render cache build post tag page template vector matrix network"
+).split()
+
+SNIPPETS = {
+    "python": "import os\n\nfor i in range(10):\n    print(os.path.join('a', str(i)))",
+    "bash": "pip install -r requirements.txt\npython blog.py update",
+    "yaml": "blog_in_path: posts\nblog_out_path: site\nworkers: 4",
+    "json": '{"posts": [], "tags": []}',
+}
+
+SIZE_DISTRIBUTIONS = ["uniform", "lognormal"]
+FRONTMATTER_SHAPES = ["full", "minimal", "legacy", "none"]
+
+
+class CorpusSpec:
+    def __init__(
+        self,
+        posts: int = 500,
+        words: int = 400,
+        size_distribution: str = "lognormal",
+        tags: int = 50,
+        tags_per_post: int = 3,
+        frontmatter_shapes: list | None = None,
+        code_blocks: int = 3,
+        tables: int = 1,
+        wiki_tables: int = 1,
+        mermaid: int = 1,
+        archived_ratio: float = 0.1,
+        seed: int = 0,
+    ) -> None:
+        """
+        Parameters of a synthetic corpus. words is the mean number of words of
+        prose per post, the block counts are the mean number per post.
+        """
+        self.posts = posts
+        self.words = words
+        self.size_distribution = size_distribution
+        self.tags = tags
+        self.tags_per_post = tags_per_post
+        self.frontmatter_shapes = frontmatter_shapes or FRONTMATTER_SHAPES
+        self.code_blocks = code_blocks
+        self.tables = tables
+        self.wiki_tables = wiki_tables
+        self.mermaid = mermaid
+        self.archived_ratio = archived_ratio
+        self.seed = seed
+
+    def to_json(self):
+        return dict(self.__dict__)
+
+
+def _count(rnd: random.Random, mean: float) -> int:
+    """Random non negative count with the given mean."""
+    if mean <= 0:
+        return 0
+    return rnd.randint(0, int(2 * mean))
+
+
+def _word_count(rnd: random.Random, spec: CorpusSpec) -> int:
+    if spec.size_distribution == "uniform":
+        return rnd.randint(1, 2 * spec.words)
+    # long tail of a few very large posts, like real blogs
+    return max(1, int(rnd.lognormvariate(0, 1) * spec.words / 1.65))
+
+
+def _prose(rnd: random.Random, words: int) -> str:
+    paragraphs = []
+    while words > 0:
+        length = min(words, rnd.randint(20, 80))
+        text = " ".join(rnd.choice(WORDS) for _ in range(length))
+        text = text.replace(" data ", " `data` ").replace(" model ", " **model** ")
+        paragraphs.append(text.capitalize() + ".")
+        words -= length
+    return "\n\n".join(paragraphs)
+
+
+def _frontmatter(rnd: random.Random, spec: CorpusSpec, i: int, tags: list) -> str:
+    shape = rnd.choice(spec.frontmatter_shapes)
+    day = date(2015, 1, 1) + timedelta(days=rnd.randint(0, 3650))
+    archived = rnd.random() < spec.archived_ratio
+    if shape == "none":
+        return ""
+    if shape == "minimal":
+        lines = [f"{BLOG_DATE_KEY}: {day}"]
+    elif shape == "legacy":
+        lines = [f"Date: {day}", f"tag: {tags}"]
+    else:
+        lines = [
+            f"{BLOG_TITLE_KEY}: Synthetic post {i}",
+            f"{BLOG_SUBTITLE_KEY}: About {rnd.choice(WORDS)}",
+            f"{BLOG_AUTHOR_KEY}: Bench Author",
+            f"{BLOG_PUBLISHED_KEY}: {day}",
+            f"{BLOG_TAGS_KEY}: {tags}",
+        ]
+        if archived:
+            lines.append(f"{BLOG_ARCHIVED_KEY}: true")
+    return "---\n" + "\n".join(lines) + "\n---\n"
+
+
+def _post(rnd: random.Random, spec: CorpusSpec, i: int) -> str:
+    tag_names = [f"tag {n}" for n in range(spec.tags)]
+    tags = rnd.sample(tag_names, min(len(tag_names), _count(rnd, spec.tags_per_post)))
+
+    blocks = []
+    for _ in range(_count(rnd, spec.code_blocks)):
+        lexer = rnd.choice(list(SNIPPETS))
+        blocks.append(f"```{lexer}\n{SNIPPETS[lexer]}\n```")
+    for _ in range(_count(rnd, spec.tables)):
+        rows = "\n".join(f"| {n} | {rnd.choice(WORDS)} |" for n in range(5))
+        blocks.append("| id | word |\n|---|---|\n" + rows)
+    for _ in range(_count(rnd, spec.wiki_tables)):
+        rows = "\n".join(f"|| {n} || {rnd.choice(WORDS)} ||" for n in range(5))
+        blocks.append("|| id || word ||\n" + rows)
+    for _ in range(_count(rnd, spec.mermaid)):
+        blocks.append("```mermaid\ngraph TD;\n    A-->B;\n    B-->C;\n```")
+
+    prose = _prose(rnd, _word_count(rnd, spec)).split("\n\n")
+    for block in blocks:
+        prose.insert(rnd.randint(0, len(prose)), block)
+
+    body = f"# Post {i}\n\n" + "\n\n".join(prose) + "\n"
+    return _frontmatter(rnd, spec, i, tags) + body
+
+
+def generate_corpus(path: Path, spec: CorpusSpec):
+    """Writes spec.posts markdown files to path."""
+    rnd = random.Random(spec.seed)
+    path.mkdir(parents=True, exist_ok=True)
+    for i in range(spec.posts):
+        (path / f"post-{i:06d}.md").write_text(_post(rnd, spec, i))
+
+
+def add_corpus_arguments(parser: ArgumentParser):
+    defaults = CorpusSpec()
+    parser.add_argument("--posts", type=int, default=defaults.posts)
+    parser.add_argument("--words", type=int, default=defaults.words)
+    parser.add_argument(
+        "--size-distribution", choices=SIZE_DISTRIBUTIONS, default=defaults.size_distribution
+    )
+    parser.add_argument("--tags", type=int, default=defaults.tags)
+    parser.add_argument("--tags-per-post", type=int, default=defaults.tags_per_post)
+    parser.add_argument(
+        "--frontmatter-shapes", nargs="+", choices=FRONTMATTER_SHAPES, default=None
+    )
+    parser.add_argument("--code-blocks", type=int, default=defaults.code_blocks)
+    parser.add_argument("--tables", type=int, default=defaults.tables)
+    parser.add_argument("--wiki-tables", type=int, default=defaults.wiki_tables)
+    parser.add_argument("--mermaid", type=int, default=defaults.mermaid)
+    parser.add_argument("--archived-ratio", type=float, default=defaults.archived_ratio)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args) -> CorpusSpec:
+    return CorpusSpec(
+        posts=args.posts,
+        words=args.words,
+        size_distribution=args.size_distribution,
+        tags=args.tags,
+        tags_per_post=args.tags_per_post,
+        frontmatter_shapes=args.frontmatter_shapes,
+        code_blocks=args.code_blocks,
+        tables=args.tables,
+        wiki_tables=args.wiki_tables,
+        mermaid=args.mermaid,
+        archived_ratio=args.archived_ratio,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("path", type=Path)
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    generate_corpus(args.path, spec_from_args(args))
@@ -5,22 +5,26 @@ from blogger.conf import BlogConfig
 
 parser = ArgumentParser()
 parser.add_argument("action", choices=["update", "show"])
+parser.add_argument(
+    "--no-cache", action="store_true", help="Do not use the rendered html cache."
+)
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="Dump cProfile stats of every build stage to the output folder.",
+)
 args = parser.parse_args()
 
 
 config = BlogConfig.from_yaml("conf.yaml")
+if args.no_cache:
+    config.use_cache = False
+if args.profile:
+    config.profile = True
 blog = Blog(config=config)
 
 if args.action == "update":
-    blog.build_index_and_create_posts()
-
-    blog.create_index()
-    blog.create_tag_pages()
-    blog.create_recent_posts()
-    blog.create_sitemap()
-    blog.create_rss_feed()
-
-    blog.blog_index.to_json()
+    blog.update()
 
 
 elif args.action == "show":
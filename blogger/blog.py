@@ -1,22 +1,50 @@
+import itertools
+import os
 import socket
 import socketserver
 import webbrowser
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime as dt
+from datetime import timezone
+from functools import cached_property, partial
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, List, Set, Tuple
 
 import frontmatter
 
-from blogger.blog_index import BlogIndex
+from blogger.blog_index import BlogIndex, PostIndex
 from blogger.blogpost import BlogPost
+from blogger.build_state import BuildState
+from blogger.cache import DiskCache
 from blogger.conf import BlogConfig
+from blogger.fingerprint import build_fingerprint, hash_bytes, post_fingerprint
+from blogger.journal import BuildJournal
+from blogger.output import OutputWriter
+from blogger.profiling import BuildProfiler, timed_call
 from blogger.render import (
+    markdown_cache_key,
     render_blog_list,
+    render_archive_page,
     render_blog_post,
     render_index,
+    render_markdown_counted,
+    render_post_nav,
+    render_post_page,
     render_tag_page,
+    use_highlight_cache,
 )
 from blogger.sitemap import Sitemap
+from blogger.sqlite_index import SqliteBlogIndex
+from blogger.tag import Tag
+from blogger.templates import TEMPLATE_DEPENDENCIES, stale_page_kinds, template_hashes
 from blogger.utils import create_http_handler, is_skip
 from feedgen.feed import FeedGenerator
 
+# what pages listing posts show of them, other changes leave these pages as they are
+LISTING_FIELDS = ("title", "subtitle", "author", "date", "archived", "tags")
+
+
 class Blog:
     def __init__(
         self,
@@ -35,15 +63,55 @@ class Blog:
             )
         self.config = config
 
-        # Initialize blog index and sitemap file
-        if config.blog_index_path.exists():
-            self.blog_index = BlogIndex.from_json(config.blog_index_path)
+        if config.use_cache:
+            self.render_cache = DiskCache(config.cache_path, config.cache_max_size)
+            self.highlight_cache = DiskCache(
+                config.highlight_cache_path, config.highlight_cache_max_size
+            )
         else:
-            self.blog_index = BlogIndex(config.blog_index_path)
-        self.sitemap = Sitemap()
+            self.render_cache = None
+            self.highlight_cache = None
+        use_highlight_cache(self.highlight_cache)
+        # pages that list posts are only rendered again if they are in
+        # stale_listings, or all of them if all_listings_stale is set
+        self.all_listings_stale = True
+        self.stale_listings: Set[Path] = set()
+        self.stale_page_kinds = set(TEMPLATE_DEPENDENCIES)
+        self.journal = BuildJournal(config.journal_path)
+        # set if this build continues one that was interrupted
+        self.resumed = False
+        # neighbors of added, removed or moved posts, whose navigation may change
+        self.nav_affected: Set[str] = set()
+        self.profiler = BuildProfiler(
+            config.blog_out_path / "profile" if config.profile else None
+        )
+        # (post id, title, last modified) of every post in the sitemap and feed,
+        # which are only generated again if these differ from the last build
+        self.feed_entries: List[Tuple[str, str, str]] = []
         self.rss_generator = FeedGenerator()
         self.init_rss_feed()
 
+    @cached_property
+    def blog_index(self) -> PostIndex:
+        """Loaded on first use, so serving the blog never reads the index."""
+        if self.config.index_backend == "sqlite":
+            return SqliteBlogIndex.open(
+                self.config.blog_index_path, self.config.index_db_path
+            )
+        elif self.config.blog_index_path.exists():
+            return BlogIndex.from_json(self.config.blog_index_path)
+        return BlogIndex(self.config.blog_index_path)
+
+    @cached_property
+    def build_state(self) -> BuildState:
+        if self.config.build_state_path.exists():
+            return BuildState.from_json(self.config.build_state_path)
+        return BuildState(self.config.build_state_path)
+
+    @cached_property
+    def output(self) -> OutputWriter:
+        return OutputWriter(self.config.blog_out_path, self.build_state.outputs)
+
     def init_rss_feed(self):
         self.rss_generator.id('https://marc-julian.com/blog')
         self.rss_generator.title('Marc Julian - Blog')
@@ -54,16 +122,51 @@ class Blog:
         self.rss_generator.link( href='https://marc-julian.com/blog/rss.xml', rel='self' )
         self.rss_generator.language('en')
 
+    def update(self):
+        """Runs all stages of a build and prints how long each of them took."""
+        # the index and build state are loaded on first use, which would
+        # otherwise happen while this dict is built and not count in any stage
+        stages = {
+            "load_index_and_build_state": self.load_index_and_build_state,
+            "build_index_and_create_posts": self.build_index_and_create_posts,
+            "create_index": self.create_index,
+            "create_tag_pages": self.create_tag_pages,
+            "create_archive_pages": self.create_archive_pages,
+            "create_recent_posts": self.create_recent_posts,
+            "create_sitemap": self.create_sitemap,
+            "create_rss_feed": self.create_rss_feed,
+            "remove_orphaned_files": self.remove_orphaned_files,
+            "blog_index.save": lambda: self.blog_index.save(),
+            "build_state.to_json": lambda: self.build_state.to_json(),
+        }
+        for name, stage in stages.items():
+            with self.profiler.stage(name):
+                stage()
+        # the build is complete, the next one has nothing to resume
+        self.journal.remove()
+
+        self.log(self.output.stats(), "OUTPUT FILES")
+        print(self.profiler.summary())
+
+    def load_index_and_build_state(self):
+        """Loads the index and the build state of the last build."""
+        self.log(f"{len(self.blog_index.post_ids())} posts", "INDEX")
+        self.log(f"{len(self.build_state.sources)} sources", "BUILD STATE")
+
     def build_index_and_create_posts(self):
         """
-        Builds the blog index and updates the sitemap file.
-        1. Read markdown file from markdown path
-        2. Load metadata from frontmatter and file object
-        3. Check if post should be skipped
-        4. Create BlogPost object
-        5. Add post to blog index
-        6. Update sitemap
-        7. Save post
+        Builds the blog index and collects the sitemap and feed entries.
+        1. Skip the post if its stat and fingerprint are unchanged
+        2. Read markdown file from markdown path
+        3. Skip the post if its fingerprint matches the recorded one
+        4. Load metadata from frontmatter and file object
+        5. Check if post should be skipped
+        6. Create BlogPost object
+        7. Render all new or changed posts
+        8. Index them and find the neighbors whose navigation changed
+        9. Save posts, record their neighbors and journal them
+        10. Checkpoint the index every checkpoint_interval seconds
+        11. Add every post to the sitemap and feed entries
         """
         markdown_files = list(self.config.blog_in_path.glob("*.md"))
         self.log(str(len(markdown_files)), "FILES")
@@ -72,78 +175,425 @@ class Blog:
         tags_path = self.config.blog_out_path / self.config.tags_path
         posts_path.mkdir(parents=True, exist_ok=True)
         tags_path.mkdir(parents=True, exist_ok=True)
+        self.resume_build()
+
+        hashes = template_hashes()
+        self.stale_page_kinds = stale_page_kinds(self.build_state.templates, hashes)
+        self.build_state.templates = hashes
+        if self.stale_page_kinds:
+            self.log(", ".join(sorted(self.stale_page_kinds)), "TEMPLATES CHANGED")
+        # an interrupted build may have stopped before the post lists were written
+        self.all_listings_stale = self.resumed
+
+        build_fp = build_fingerprint(self.config, hashes)
+        changed_posts: List[BlogPost] = []
+        # a post that is missing from the index is never unchanged
+        indexed_ids = set(self.blog_index.post_ids())
+        unchanged_posts = 0
 
         for file in markdown_files:
-            file_content = file.read_text()
-            post_meta = frontmatter.loads(file_content)
-            post = BlogPost(post_meta, file)
+            stat = file.stat()
+
+            # files with an unchanged stat are never opened
+            if not self.config.force_update:
+                entry = self.build_state.unchanged_source(file, stat)
+                if entry is not None:
+                    if entry["skip"]:
+                        self.log(file.name, "SKIP")
+                        continue
+                    if file.stem in indexed_ids and self.unchanged_post(
+                        file, entry, build_fp
+                    ):
+                        unchanged_posts += 1
+                        continue
+
+            raw = file.read_bytes()
+            content_hash = hash_bytes(raw)
+            fingerprint = post_fingerprint(content_hash, build_fp)
+            self.build_state.update_source(file, stat, content_hash)
+
+            if not self.config.force_update:
+                entry = self.build_state.sources[file.name]
+                if file.stem in indexed_ids and self.unchanged_post(
+                    file, entry, build_fp
+                ):
+                    unchanged_posts += 1
+                    continue
+
+            post_meta = frontmatter.loads(raw.decode("utf-8"))
+            post = BlogPost(post_meta, file, fingerprint, mtime=stat.st_mtime)
 
             if not self.config.force_update:
                 if is_skip(post_meta):
                     self.log(file.name, "SKIP")
-                    self.blog_index.remove_unused_tags(tags_path, post)
-                    self.blog_index.remove_post(post, posts_path)
+                    self.build_state.update_source(file, stat, content_hash, skip=True)
+                    self.remove_post(post)
                     continue
-                # if self.blog_index.not_modified(post) and self.blog_index.post_in_index(
-                #     post
-                # ):
-                #     self.log(file.name, "NOMOD")
-                #     continue
 
             self.log(file.name, "GENERATE POST")
+            self.update_listings(post)
+            changed_posts.append(post)
+            self.add_feed_entry(
+                post.id, post.title, post.last_modified.strftime("%Y-%m-%d")
+            )
+        self.log(str(unchanged_posts), "NOMOD")
+
+        # posts whose markdown file was deleted or renamed
+        markdown_ids = {file.stem for file in markdown_files}
+        for post_id in self.blog_index.post_ids():
+            if post_id not in markdown_ids:
+                self.remove_post(self.blog_index.get_post(post_id))
+
+        # every page is rendered with the neighbors it has once all posts are indexed
+        fingerprints = {post.id: post.fingerprint for post in changed_posts}
+        retitled = set()
+        for post in changed_posts:
+            if self.blog_index.get_title(post.id) != post.title:
+                retitled.add(post.id)
+            self.add_pending_post(post)
+        for post in changed_posts:
+            self.nav_affected.update(self.blog_index.neighbors(post.id))
 
-            post_html = render_blog_post(post, self.config)
-            html_path = posts_path / post.html_path
-            if not html_path.exists():
-                html_path.mkdir()
-            (html_path / "index.html").write_text(post_html)
+        for post in self.stale_nav_posts(set(fingerprints), retitled):
+            self.log(post.markdown_file.name, "UPDATE NAV")
+            fingerprints[post.id] = post.fingerprint
+            self.add_pending_post(post)
+            # its source is unchanged, so only the journal tells a resumed
+            # build that this page still has to be rendered again
+            self.journal.append(post.to_json())
+            changed_posts.append(post)
 
+        interval = self.config.checkpoint_interval
+        last_checkpoint = perf_counter()
+        for post, post_html in zip(changed_posts, self.render_posts(changed_posts)):
+            self.output.write(posts_path / post.html_path / "index.html", post_html)
+            post.fingerprint = fingerprints[post.id]
             self.blog_index.add_post(post)
+            neighbors = self.blog_index.neighbors(post.id)
+            self.build_state.neighbors[post.id] = list(neighbors)
+            post_data = post.to_json()
+            self.build_state.record_post(post_data)
+            self.journal.append(post_data)
+            if interval and perf_counter() - last_checkpoint >= interval:
+                self.checkpoint()
+                last_checkpoint = perf_counter()
 
-            post_url = f"https://www.marc-julian.com/blog/{self.config.posts_path}/{post.html_path}"
-            self.sitemap.update_sitemap(
-                url=post_url,
-                lastmod=post.last_modified.strftime("%Y-%m-%d"),
-            )
-            fe = self.rss_generator.add_entry()
-            fe.id(post_url)
-            fe.title(post.title)
-            fe.link(href=post_url)
+        self.remove_unused_tags()
+
+        self.build_state.prune_sources(file.name for file in markdown_files)
+        if self.render_cache:
+            self.log(self.render_cache.stats(), "RENDER CACHE")
+        if self.highlight_cache:
+            self.log(self.highlight_cache.stats(), "HIGHLIGHT CACHE")
+
+    def resume_build(self):
+        """Adds the posts an interrupted build completed after its last checkpoint."""
+        if not self.journal.exists():
+            return
+        self.resumed = True
+        resumed_posts = 0
+        for post_data in self.journal.replay():
+            self.blog_index.add_post(BlogPost.from_json(post_data))
+            # the build state on disk predates the journal
+            self.build_state.record_post(post_data)
+            resumed_posts += 1
+        self.log(f"{resumed_posts} posts since the last checkpoint", "RESUME BUILD")
+        # replay stops at a line torn by the interruption, new entries appended
+        # after it would be lost, so this build starts with an empty journal
+        self.checkpoint()
+
+    def checkpoint(self):
+        """Saves the index and build state, which now contain all journaled posts."""
+        self.blog_index.save()
+        self.build_state.to_json()
+        self.journal.truncate()
+        self.log(f"{len(self.blog_index.post_ids())} posts", "CHECKPOINT")
+
+    def add_pending_post(self, post: BlogPost):
+        """
+        Indexes a post that is about to be rendered. It has no fingerprint
+        until its page is written, so a checkpoint never marks it as done.
+        """
+        self.nav_affected.update(self.blog_index.neighbors(post.id))
+        post.fingerprint = ""
+        self.blog_index.add_post(post)
+        self.build_state.record_post(post.to_json())
+
+    def stale_nav_posts(
+        self, rendered_ids: Set[str], retitled: Set[str]
+    ) -> List[BlogPost]:
+        """
+        Posts next to an added, removed or moved post whose page has to be
+        rendered again because a neighbor or the title of one changed.
+        """
+        stale = []
+        for post_id in sorted(self.nav_affected - rendered_ids - {None}):
+            neighbors = self.blog_index.neighbors(post_id)
+            recorded = self.build_state.neighbors.get(post_id)
+            if recorded != list(neighbors) or retitled.intersection(neighbors):
+                # only posts that are rendered again are decoded
+                post = self.blog_index.get_post(post_id)
+                if post is not None:
+                    stale.append(post)
+        self.nav_affected = set()
+        return stale
+
+    def post_nav(self, post: BlogPost) -> str:
+        older_id, newer_id = self.blog_index.neighbors(post.id)
+        older = older_id and (older_id, self.blog_index.get_title(older_id))
+        newer = newer_id and (newer_id, self.blog_index.get_title(newer_id))
+        return render_post_nav(older, newer, self.config)
+
+    def remove_post(self, post: BlogPost):
+        """Removes the post from the index and output."""
+        self.nav_affected.update(self.blog_index.neighbors(post.id))
+        record = self.blog_index.get_record(post.id)
+        if not self.blog_index.remove_post(post):
+            return
+        self.build_state.neighbors.pop(post.id, None)
+        self.mark_listings_stale(record)
+        posts_path = self.config.blog_out_path / self.config.posts_path
+        self.log(post.title, "REMOVE POST")
+        self.output.remove(posts_path / post.html_path)
+
+    def update_listings(self, post: BlogPost):
+        """
+        Marks the pages that list a changed post stale, but only if what they
+        show of it changed. A post that moved or lost a tag also leaves the
+        pages it was listed on before.
+        """
+        record = self.blog_index.get_record(post.id)
+        post_data = post.to_json()
+        if record is not None and all(
+            record.get(field) == post_data[field] for field in LISTING_FIELDS
+        ):
+            return
+        self.mark_listings_stale(record)
+        self.mark_listings_stale(post_data)
+
+    def mark_listings_stale(self, record: dict | None):
+        """Marks the index and the tag and archive pages that list the post stale."""
+        if record is None:
+            return
+        out = self.config.blog_out_path
+        tags_path = out / self.config.tags_path
+        year_path = out / self.config.archive_path / record["date"][:4]
+        tag_ids = {Tag.from_json(tag).id for tag in record["tags"]}
+        # the year tag page lists every post of its year
+        tag_ids.add(str(int(record["date"][:4])))
+        self.stale_listings.update(
+            [
+                out / "index.html",
+                out / "recent_posts.html",
+                year_path / "index.html",
+                year_path / record["date"][5:7] / "index.html",
+            ]
+        )
+        self.stale_listings.update(tags_path / tag_id / "index.html" for tag_id in tag_ids)
+
+    def remove_unused_tags(self):
+        """Removes the pages of tags that are no longer used by any post."""
+        tags_path = self.config.blog_out_path / self.config.tags_path
+        for tag in self.blog_index.remove_unused_tags():
+            self.log(tag.name, "REMOVE TAG")
+            self.output.remove(tags_path / tag.id)
+
+    def unchanged_post(self, file: Path, entry: dict, build_fp: str) -> bool:
+        """
+        Keeps the page of the file and adds it to the feed if it is still up
+        to date. Everything is taken from the build state entry of the file,
+        so neither a BlogPost is created nor the index record decoded.
+        """
+        post = entry.get("post")
+        if post is None:
+            # build states of older versions only have the index record
+            record = self.blog_index.get_record(file.stem)
+            post = record and self.build_state.record_post(record)
+        if not post or post["fingerprint"] != post_fingerprint(entry["hash"], build_fp):
+            return False
+        page = f"{self.config.posts_path.as_posix()}/{file.stem}/index.html"
+        if not self.output.recorded(page):
+            return False
+        self.output.keep_key(page)
+        self.add_feed_entry(file.stem, post["title"], post["last_modified"])
+        return True
+
+    def render_posts(self, posts: List[BlogPost]) -> Iterator[str]:
+        """
+        Renders the posts in order and yields each page as soon as it is done.
+        With more than one worker the markdown conversion of all uncached
+        posts is spread over a process pool.
+        """
+        workers = self.config.workers or os.cpu_count() or 1
+        if workers <= 1 or len(posts) <= 1:
+            for post in posts:
+                nav = self.post_nav(post)
+                yield self.profiler.post(
+                    post.markdown_file.name,
+                    render_blog_post,
+                    post,
+                    self.config,
+                    self.render_cache,
+                    nav,
+                )
+            return
+
+        cache = self.render_cache
+        fragments = [cache and cache.get(markdown_cache_key(post)) for post in posts]
+        pending = [i for i, fragment in enumerate(fragments) if fragment is None]
+        if not pending:
+            for post, fragment in zip(posts, fragments):
+                nav = self.post_nav(post)
+                yield render_post_page(post, fragment, self.config, nav)
+            return
+
+        # workers write highlighted code blocks without evicting, the shared
+        # cache is evicted from once they are done
+        highlight_cache = self.highlight_cache
+        worker_cache = highlight_cache and DiskCache(highlight_cache.cache_path, None)
+        try:
+            # hand out posts in chunks so small posts are not dominated by ipc
+            chunksize = max(1, len(pending) // (workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(pending)),
+                initializer=use_highlight_cache,
+                initargs=(worker_cache,),
+            ) as executor:
+                contents = [posts[i].content for i in pending]
+                converted = executor.map(
+                    partial(timed_call, render_markdown_counted),
+                    contents,
+                    chunksize=chunksize,
+                )
+                for i, post in enumerate(posts):
+                    fragment = fragments[i]
+                    if fragment is None:
+                        (fragment, hits, misses), wall, cpu = next(converted)
+                        self.profiler.add_post(post.markdown_file.name, wall, cpu)
+                        if highlight_cache:
+                            highlight_cache.hits += hits
+                            highlight_cache.misses += misses
+                        if cache:
+                            cache.put(markdown_cache_key(post), fragment)
+                    nav = self.post_nav(post)
+                    yield render_post_page(post, fragment, self.config, nav)
+        finally:
+            # also runs when the caller stops iterating after the last page
+            if highlight_cache:
+                highlight_cache.evict(rescan=True)
+
+    def add_feed_entry(self, post_id: str, title: str, last_modified: str):
+        """Adds the post to the sitemap and the rss feed, last_modified is YYYY-MM-DD."""
+        self.feed_entries.append((post_id, title, last_modified))
+
+    def post_url(self, post_id: str) -> str:
+        return f"https://www.marc-julian.com/blog/{self.config.posts_path}/{post_id}"
+
+    @cached_property
+    def feed_hash(self) -> str:
+        """Hash of everything the sitemap and feed are generated from."""
+        return hash_bytes(
+            str(self.config.posts_path), *itertools.chain.from_iterable(self.feed_entries)
+        )
+
+    def feed_unchanged(self, path: Path) -> bool:
+        """Checks if the sitemap or feed at path lists the same posts and keeps it."""
+        if (
+            self.config.force_update
+            or self.build_state.feed != self.feed_hash
+            or not path.exists()
+        ):
+            return False
+        self.output.keep(path)
+        return True
+
+    def needs_render(self, page_kind: str, path: Path) -> bool:
+        """Checks if a page listing posts is out of date and otherwise keeps it."""
+        if (
+            self.config.force_update
+            or self.all_listings_stale
+            or path in self.stale_listings
+            or page_kind in self.stale_page_kinds
+            or not path.exists()
+        ):
+            return True
+        self.output.keep(path)
+        return False
 
     def create_tag_pages(self):
         for tag in self.blog_index.tags:
-            tagged_posts = [
-                post
-                for post in self.blog_index.posts
-                if tag in post.tags
-                or post.date.year == (tag.name.isnumeric() and int(tag.name))
-            ]
+            tag_folder = self.config.blog_out_path / self.config.tags_path / tag.id
+            if not self.needs_render("tag_page", tag_folder / "index.html"):
+                continue
+
+            tagged_posts = self.blog_index.posts_with_tag(tag.id)
 
             tag_page = render_tag_page(tag, tagged_posts, self.config)
-            tag_folder = self.config.blog_out_path / self.config.tags_path / tag.id
-            if not tag_folder.exists():
-                tag_folder.mkdir()
-            (tag_folder / "index.html").write_text(tag_page)
+            self.output.write(tag_folder / "index.html", tag_page)
+
+    def create_archive_pages(self):
+        """Renders a page for every year and every month with posts."""
+        archive_path = self.config.blog_out_path / self.config.archive_path
+        pages = [(year, None) for year in self.blog_index.years()]
+        pages += self.blog_index.months()
+        for year, month in pages:
+            page_folder = archive_path / str(year)
+            if month is not None:
+                page_folder = page_folder / f"{month:02d}"
+            if not self.needs_render("archive", page_folder / "index.html"):
+                continue
+
+            posts = self.blog_index.query(year=year, month=month)
+            archive_page = render_archive_page(year, month, posts, self.config)
+            self.output.write(page_folder / "index.html", archive_page)
 
     def create_index(self):
+        index_path = self.config.blog_out_path / "index.html"
+        if not self.needs_render("index", index_path):
+            return
         index_html = render_index(self.blog_index, self.config)
-        (self.config.blog_out_path / "index.html").write_text(index_html)
+        self.output.write(index_path, index_html)
 
     def create_recent_posts(self):
-        posts = self.blog_index.posts
-        non_archived_posts = filter(lambda post: not post.archived, posts)
-        sorted_posts = sorted(
-            non_archived_posts, key=lambda post: post.date, reverse=True
-        )
-        recent_posts = sorted_posts[:5]
+        recent_posts_path = self.config.blog_out_path / "recent_posts.html"
+        if not self.needs_render("recent_posts", recent_posts_path):
+            return
+        recent_posts = self.blog_index.recent_posts(5)
         recent_posts_html = render_blog_list(recent_posts, self.config)
-        (self.config.blog_out_path / "recent_posts.html").write_text(recent_posts_html)
+        self.output.write(recent_posts_path, recent_posts_html)
 
     def create_sitemap(self):
-        self.sitemap.save_sitemap(self.config.blog_out_path)
+        sitemap_path = self.config.blog_out_path / "sitemap.xml"
+        if self.feed_unchanged(sitemap_path):
+            return
+        sitemap = Sitemap()
+        for post_id, _, last_modified in self.feed_entries:
+            sitemap.update_sitemap(url=self.post_url(post_id), lastmod=last_modified)
+        self.output.write(sitemap_path, sitemap.to_xml())
 
     def create_rss_feed(self):
-        self.rss_generator.rss_file(self.config.blog_out_path / 'rss.xml')
+        rss_path = self.config.blog_out_path / "rss.xml"
+        if not self.feed_unchanged(rss_path):
+            for post_id, title, _ in self.feed_entries:
+                post_url = self.post_url(post_id)
+                fe = self.rss_generator.add_entry()
+                fe.id(post_url)
+                fe.title(title)
+                fe.link(href=post_url)
+            # the newest post decides the build date so unchanged feeds stay identical
+            if self.feed_entries:
+                newest = max(last_modified for _, _, last_modified in self.feed_entries)
+                last_modified = dt.strptime(newest, "%Y-%m-%d")
+                self.rss_generator.lastBuildDate(
+                    last_modified.replace(tzinfo=timezone.utc)
+                )
+            self.output.write(rss_path, self.rss_generator.rss_str())
+        # the sitemap is created first, so both are up to date now
+        self.build_state.feed = self.feed_hash
+
+    def remove_orphaned_files(self):
+        """Removes all files of earlier builds that were not produced by this build."""
+        self.output.remove_stale()
 
     def open_blog(self):
         # start http server at output path
@@ -1,94 +1,471 @@
+import itertools
 import json
-import shutil
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, Iterator, List, Set, Tuple
 
 from blogger.blogpost import BlogPost
 from blogger.tag import Tag
+from blogger.utils import atomic_open
 
+# what the views and tag counts are derived from, a post or its decoded record
+PostFields = BlogPost | dict
+# (date, -insertion sequence, post id), ascending, so a view read backwards is
+# newest first with posts of the same date in insertion order
+SortKey = Tuple[str, int, str]
+
+
+def iter_json_array(
+    path: Path, key: str, chunk_size: int = 1 << 16, with_text: bool = False
+) -> Iterator[dict]:
+    """
+    Yields the elements of the array stored under key in the json object in
+    path one at a time, without reading the whole file into memory. With
+    with_text every element is yielded together with its json text.
+    """
+    decoder = json.JSONDecoder()
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    whitespace = re.compile(r"[\s,]*")
+
+    with open(path, "r") as f:
+        buffer = ""
+        while True:
+            match = start.search(buffer)
+            if match:
+                buffer = buffer[match.end() :]
+                break
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buffer += chunk
+
+        eof = False
+        # elements are decoded at an offset, the buffer is only cut when it is refilled
+        pos = 0
+        while True:
+            pos = whitespace.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield (element, buffer[pos:end]) if with_text else element
+            pos = end
+
+
+def _tags(fields: PostFields) -> List[Tag]:
+    if isinstance(fields, dict):
+        return [Tag.from_json(tag) for tag in fields["tags"]]
+    return fields.tags
+
+
+def _date_key(fields: PostFields) -> str:
+    """The date of the post as YYYY-MM-DD, which sorts like the date itself."""
+    if isinstance(fields, dict):
+        return fields["date"]
+    return fields.date.strftime("%Y-%m-%d")
+
+
+def _archived(fields: PostFields) -> bool:
+    if isinstance(fields, dict):
+        return bool(fields["archived"])
+    return bool(fields.archived)
+
+
+def _year_month(key: SortKey) -> Tuple[int, int]:
+    return int(key[0][:4]), int(key[0][5:7])
+
+
+def _remove_key(view: List[SortKey], key: SortKey):
+    i = bisect_left(view, key)
+    if i < len(view) and view[i] == key:
+        del view[i]
+
+
+def _has_key(view: List[SortKey], key: SortKey) -> bool:
+    i = bisect_left(view, key)
+    return i < len(view) and view[i] == key
+
+
+class PostIndex(ABC):
+    """
+    What a build needs from an index of blog posts, whether it is kept in
+    memory or in a database. Posts are returned newest first unless noted.
+    """
+
+    # all tags used by at least one post
+    tags: Set[Tag]
 
-class BlogIndex:
     def __init__(self, blog_index_path: Path) -> None:
-        """Stores all blog posts and tags."""
-        self.posts: List[BlogPost] = []
-        self.tags: Set[Tag] = set()
         self.blog_index_path = blog_index_path
+        # tags whose count dropped to zero since the last remove_unused_tags
+        self._unused_tags: List[Tag] = []
 
-    @classmethod
-    def from_json(cls, path: Path):
-        blog_index = cls(path)
-        data = json.loads(path.read_text())
-        blog_index.posts = [BlogPost.from_json(post) for post in data["posts"]]
-        blog_index.tags = {Tag.from_json(tag) for tag in data["tags"]}
-        return blog_index
+    @property
+    @abstractmethod
+    def posts(self) -> List[BlogPost]:
+        """All posts in insertion order, setting it replaces them."""
+
+    @abstractmethod
+    def post_ids(self) -> List[str]:
+        """The ids of all posts in insertion order."""
+
+    @abstractmethod
+    def get_post(self, post_id: str) -> BlogPost | None:
+        """The post with the id, None if it is not indexed."""
+
+    @abstractmethod
+    def get_title(self, post_id: str) -> str | None:
+        """The title of the post, for links to it that need nothing else."""
+
+    @abstractmethod
+    def get_record(self, post_id: str) -> dict | None:
+        """The json record of the post, without creating a BlogPost."""
+
+    @abstractmethod
+    def post_in_index(self, post: BlogPost) -> bool:
+        """Checks if a post with the id of post is indexed."""
+
+    @abstractmethod
+    def add_post(self, post: BlogPost):
+        """Replaces an existing post with the same id in place, otherwise appends it."""
+
+    @abstractmethod
+    def remove_post(self, post: BlogPost) -> bool:
+        """Removes the post from the index and returns whether it was indexed."""
+
+    @abstractmethod
+    def posts_with_tag(self, tag_id: str) -> List[BlogPost]:
+        """All posts with the tag. Year tags contain all posts of their year."""
+
+    @abstractmethod
+    def sorted_posts(self, archived: bool | None = None) -> List[BlogPost]:
+        """Posts sorted by date, optionally only (non) archived ones."""
+
+    @abstractmethod
+    def recent_posts(self, count: int) -> List[BlogPost]:
+        """The newest non archived posts."""
+
+    @abstractmethod
+    def neighbors(self, post_id: str) -> Tuple[str | None, str | None]:
+        """Ids of the next older and the next newer post, None at either end."""
+
+    @abstractmethod
+    def years(self) -> List[int]:
+        """All years with posts, oldest first."""
+
+    @abstractmethod
+    def months(self) -> List[Tuple[int, int]]:
+        """All (year, month) pairs with posts, oldest first."""
+
+    @abstractmethod
+    def query(
+        self,
+        tag: str | None = None,
+        year: int | None = None,
+        month: int | None = None,
+        start: date | None = None,
+        end: date | None = None,
+        archived: bool | None = None,
+    ) -> List[BlogPost]:
+        """
+        Posts matching all given filters sorted by date. tag is a tag id,
+        start and end are inclusive.
+        """
+
+    @abstractmethod
+    def remove_unused_tags(self) -> List[Tag]:
+        """
+        Returns the tags that are no longer used by any post since the last call.
+        Tags are only reported once no other tag with the same id is used either.
+        """
+
+    @abstractmethod
+    def _json_posts(self) -> Iterator[str]:
+        """The json text of every post record in insertion order."""
 
     def sort_posts(self, by: str = "date"):
         """Sort post by date or title"""
         if by == "date":
-            self.posts.sort(key=lambda post: post.date, reverse=True)
+            posts = self.sorted_posts()
         elif by == "title":
-            self.posts.sort(key=lambda post: post.title, reverse=True)
+            posts = sorted(self.posts, key=lambda post: post.title, reverse=True)
         else:
             raise ValueError(f"Unknown sort key: {by}")
+        self.posts = posts
+
+    def to_json(self):
+        """Writes the index post by post instead of building it in memory first."""
+        with atomic_open(self.blog_index_path) as f:
+            f.write('{"posts": [')
+            for i, text in enumerate(self._json_posts()):
+                if i:
+                    f.write(", ")
+                f.write(text)
+            f.write('], "tags": ')
+            f.write(json.dumps([tag.to_json() for tag in self.tags]))
+            f.write("}")
+
+    def save(self):
+        """Persists the index at the end of a build."""
+        self.to_json()
+
+
+class BlogIndex(PostIndex):
+    def __init__(self, blog_index_path: Path) -> None:
+        """Stores all blog posts and tags in memory."""
+        super().__init__(blog_index_path)
+        # post id -> json text of its record, in insertion order. The text takes
+        # a fraction of the memory of the decoded record or a BlogPost, so
+        # posts are only decoded when they are accessed and not kept after that
+        self._posts: Dict[str, str] = {}
+        # views sorted by date that are kept up to date instead of sorting on every read
+        self._sequence = itertools.count()
+        self._keys: Dict[str, SortKey] = {}
+        self._by_date: List[SortKey] = []
+        self._by_archived: Dict[bool, List[SortKey]] = {False: [], True: []}
+        # tag id -> view of the posts with that tag
+        self._by_tag: Dict[str, List[SortKey]] = {}
+        # year -> view and (year, month) -> view, the buckets of the archive pages
+        self._by_year: Dict[int, List[SortKey]] = {}
+        self._by_month: Dict[Tuple[int, int], List[SortKey]] = {}
+        # tag -> number of posts with that tag, tags contains all tags with a count
+        self._tag_counts: Counter[Tag] = Counter()
+        self.tags: Set[Tag] = set()
+
+    @classmethod
+    def from_json(cls, path: Path):
+        """
+        Streams the posts of the index into lightweight records, BlogPost
+        objects are only created once a post is accessed.
+        """
+        blog_index = cls(path)
+        # tags are derived from the posts
+        for post_data, text in iter_json_array(path, "posts", with_text=True):
+            if "content" in post_data:
+                # migrate records of indexes that still stored the whole content
+                blog_index.add_post(BlogPost.from_json(post_data))
+            else:
+                blog_index._add(post_data["id"], text, post_data)
+        return blog_index
+
+    def _post(self, post_id: str) -> BlogPost:
+        return BlogPost.from_json(json.loads(self._posts[post_id]))
+
+    @property
+    def posts(self) -> List[BlogPost]:
+        return [self._post(post_id) for post_id in self._posts]
+
+    @posts.setter
+    def posts(self, posts: List[BlogPost]):
+        self._posts = {}
+        self._keys = {}
+        self._by_date = []
+        self._by_archived = {False: [], True: []}
+        self._by_tag = {}
+        self._by_year = {}
+        self._by_month = {}
+        self._tag_counts = Counter()
+        self.tags = set()
+        for post in posts:
+            self.add_post(post)
+
+    def post_ids(self) -> List[str]:
+        return list(self._posts)
 
     def add_post(self, post: BlogPost):
-        # update post in post list if it already exists
-        for i, p in enumerate(self.posts):
-            if p.id == post.id:
-                self.posts[i] = post
-                break
-        # otherwise add it as a new one
-        else:
-            self.posts.append(post)
-
-        # update tags with the tags from the new post
-        for tag in post.tags:
-            self.tags.discard(tag)  # Remove tag if present, do nothing otherwise
-            self.tags.add(tag)  # Add updated tag (if not present)
-
-    def remove_post(self, post: BlogPost, posts_path: Path):
-        for i, p in enumerate(self.posts):
-            if p.id == post.id:
-                self.posts.pop(i)
-                if (posts_path / post.html_path).exists():
-                    print(f"Removing unused post: {post.title}")
-                    shutil.rmtree(posts_path / post.html_path)
-                break
+        self._add(post.id, json.dumps(post.to_json()), post)
 
-    def remove_unused_tags(self, tags_path: Path, post: BlogPost):
-        # remove tags that are no longer used
-        for tag in post.tags:
-            if not any(tag in post.tags for post in self.posts):
-                print(tag.name)
-                self.tags.discard(tag)
-                if (tags_path / f"{tag.id}").exists():
-                    print(f"Removing unused tag: {tag.name}")
-                    shutil.rmtree(tags_path / f"{tag.id}")
-
-    def _to_json(self):
-        return json.dumps(
-            {
-                "posts": [post.to_json() for post in self.posts],
-                "tags": [tag.to_json() for tag in self.tags],
-            }
-        )
+    def _add(self, post_id: str, text: str, fields: PostFields):
+        old_text = self._posts.get(post_id)
+        self._posts[post_id] = text
 
-    def post_in_index(self, post: BlogPost) -> bool:
-        return any(p.id == post.id for p in self.posts)
+        new_tags = set(_tags(fields))
+        old_tags = set()
+        if old_text is None:
+            sequence = next(self._sequence)
+        else:
+            # a replaced post keeps its place among posts of the same date
+            sequence = -self._keys[post_id][1]
+            old_fields = json.loads(old_text)
+            old_tags = set(_tags(old_fields))
+            self._unsort(post_id, old_tags, old_fields)
+        self._keys[post_id] = (_date_key(fields), -sequence, post_id)
+        self._sort(post_id, new_tags, fields)
 
-    def to_json(self):
-        self.blog_index_path.write_text(self._to_json())
+        # count the new tags before releasing the old ones so shared tags never drop to zero
+        for tag in new_tags:
+            self._count_tag(tag, 1)
+        for tag in old_tags:
+            self._count_tag(tag, -1)
 
-    def not_modified(self, post: BlogPost) -> bool:
-        """Checks if the post has been modified since the last build."""
-        if not self.blog_index_path.exists():
+    def remove_post(self, post: BlogPost) -> bool:
+        old_text = self._posts.pop(post.id, None)
+        if old_text is None:
             return False
+        old_fields = json.loads(old_text)
+        old_tags = set(_tags(old_fields))
+        self._unsort(post.id, old_tags, old_fields)
+        del self._keys[post.id]
+        for tag in old_tags:
+            self._count_tag(tag, -1)
+        return True
+
+    def _sort(self, post_id: str, tags: Set[Tag], fields: PostFields):
+        """Inserts the post into the views it belongs to."""
+        key = self._keys[post_id]
+        insort(self._by_date, key)
+        insort(self._by_archived[_archived(fields)], key)
+        for tag_id in self._tag_ids(tags, fields):
+            insort(self._by_tag.setdefault(tag_id, []), key)
+        year, month = _year_month(key)
+        insort(self._by_year.setdefault(year, []), key)
+        insort(self._by_month.setdefault((year, month), []), key)
+
+    def _unsort(self, post_id: str, tags: Set[Tag], fields: PostFields):
+        """Removes the post from the views it was inserted into."""
+        key = self._keys[post_id]
+        _remove_key(self._by_date, key)
+        _remove_key(self._by_archived[_archived(fields)], key)
+        year, month = _year_month(key)
+        buckets = [(self._by_year, year), (self._by_month, (year, month))]
+        buckets += [(self._by_tag, tag_id) for tag_id in self._tag_ids(tags, fields)]
+        for views, bucket in buckets:
+            view = views.get(bucket)
+            if view is not None:
+                _remove_key(view, key)
+                if not view:
+                    del views[bucket]
+
+    def _count_tag(self, tag: Tag, delta: int):
+        count = self._tag_counts[tag] + delta
+        if count > 0:
+            self._tag_counts[tag] = count
+            self.tags.add(tag)
+        else:
+            del self._tag_counts[tag]
+            self.tags.discard(tag)
+            self._unused_tags.append(tag)
+
+    @staticmethod
+    def _tag_ids(tags: Set[Tag], fields: PostFields) -> Set[str]:
+        # the year of a post is a tag, even if an old index entry lacks it
+        year = str(int(_date_key(fields).split("-")[0]))
+        return {tag.id for tag in tags} | {year}
+
+    def _read(self, view: List[SortKey]) -> List[BlogPost]:
+        return [self._post(post_id) for _, _, post_id in reversed(view)]
+
+    def posts_with_tag(self, tag_id: str) -> List[BlogPost]:
+        return self._read(self._by_tag.get(tag_id, []))
+
+    def sorted_posts(self, archived: bool | None = None) -> List[BlogPost]:
+        if archived is None:
+            return self._read(self._by_date)
+        return self._read(self._by_archived[archived])
+
+    def recent_posts(self, count: int) -> List[BlogPost]:
+        if count <= 0:
+            return []
+        return self._read(self._by_archived[False][-count:])
+
+    def neighbors(self, post_id: str) -> Tuple[str | None, str | None]:
+        key = self._keys.get(post_id)
+        if key is None:
+            return None, None
+        i = bisect_left(self._by_date, key)
+        older = self._by_date[i - 1][2] if i > 0 else None
+        newer = self._by_date[i + 1][2] if i + 1 < len(self._by_date) else None
+        return older, newer
+
+    def years(self) -> List[int]:
+        return sorted(self._by_year)
+
+    def months(self) -> List[Tuple[int, int]]:
+        return sorted(self._by_month)
+
+    def query(
+        self,
+        tag: str | None = None,
+        year: int | None = None,
+        month: int | None = None,
+        start: date | None = None,
+        end: date | None = None,
+        archived: bool | None = None,
+    ) -> List[BlogPost]:
+        """
+        The smallest view that covers the filters is narrowed to the date
+        range with bisect and only the keys within it are checked.
+        """
+        views = [self._by_date]
+        if archived is not None:
+            views.append(self._by_archived[archived])
+        if tag is not None:
+            views.append(self._by_tag.get(tag, []))
+        if year is not None and month is not None:
+            views.append(self._by_month.get((year, month), []))
+        elif year is not None:
+            views.append(self._by_year.get(year, []))
+        view = min(views, key=len)
+
+        low, high = 0, len(view)
+        if start is not None:
+            low = bisect_left(view, (start.strftime("%Y-%m-%d"),))
+        if end is not None:
+            high = bisect_left(view, (end.strftime("%Y-%m-%d"), float("inf")))
+
+        keys = []
+        for key in view[low:high]:
+            # the other filters are checked against their views, records stay encoded
+            key_year, key_month = _year_month(key)
+            if (
+                (year is not None and key_year != year)
+                or (month is not None and key_month != month)
+                or (
+                    archived is not None
+                    and not _has_key(self._by_archived[archived], key)
+                )
+                or (tag is not None and not _has_key(self._by_tag.get(tag, []), key))
+            ):
+                continue
+            keys.append(key)
+        return self._read(keys)
+
+    def remove_unused_tags(self) -> List[Tag]:
+        unused_tags = [
+            tag
+            for tag in self._unused_tags
+            if tag not in self._tag_counts and tag.id not in self._by_tag
+        ]
+        self._unused_tags = []
+        return list(dict.fromkeys(unused_tags))
+
+    def _json_posts(self) -> Iterator[str]:
+        return iter(self._posts.values())
+
+    def post_in_index(self, post: BlogPost) -> bool:
+        return post.id in self._posts
 
-        with open(self.blog_index_path, "r") as f:
-            data = json.load(f)
+    def get_post(self, post_id: str) -> BlogPost | None:
+        if post_id not in self._posts:
+            return None
+        return self._post(post_id)
 
-        for p in data["posts"]:
-            if p["id"] == post.id:
-                return p["last_modified"] == post.last_modified.strftime("%Y-%m-%d")
+    def get_title(self, post_id: str) -> str | None:
+        text = self._posts.get(post_id)
+        return text and json.loads(text)["title"]
 
-        return False
+    def get_record(self, post_id: str) -> dict | None:
+        text = self._posts.get(post_id)
+        return text and json.loads(text)
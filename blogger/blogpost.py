@@ -2,6 +2,7 @@ from datetime import datetime as dt
 from pathlib import Path
 from typing import List
 
+import frontmatter
 from frontmatter import Post
 
 from blogger.constants import (
@@ -10,29 +11,76 @@ from blogger.constants import (
     BLOG_TAGS_KEY,
     BLOG_TITLE_KEY,
 )
+from blogger.fingerprint import hash_bytes
 from blogger.tag import Tag
 from blogger.utils import get_date, is_archived
 
 
 class BlogPost:
-    def __init__(self, post_meta: Post, markdown_file: Path):
+    # posts are kept in memory for the whole build, desc and the display and
+    # html path fields are derived on access instead of stored per post
+    __slots__ = (
+        "title",
+        "subtitle",
+        "author",
+        "_content",
+        "content_hash",
+        "markdown_file",
+        "id",
+        "last_modified",
+        "fingerprint",
+        "date",
+        "tags",
+        "archived",
+    )
+
+    def __init__(
+        self,
+        post_meta: Post,
+        markdown_file: Path,
+        fingerprint: str = "",
+        mtime: float | None = None,
+    ):
         self.title = post_meta.get(BLOG_TITLE_KEY) or markdown_file.stem
         self.subtitle = post_meta.get(BLOG_SUBTITLE_KEY) or ""
         self.author = post_meta.get(BLOG_AUTHOR_KEY) or "Marc Julian Schwarz"
-        self.desc = f"{self.title} - {self.subtitle} - {self.author}"
-        self.content = post_meta.content
+        self._content = post_meta.content
+        self.content_hash = hash_bytes(self._content)
         self.markdown_file = markdown_file
         self.id = markdown_file.stem
-        self.last_modified = dt.fromtimestamp(markdown_file.stat().st_mtime)
+        if mtime is None:
+            mtime = markdown_file.stat().st_mtime
+        self.last_modified = dt.fromtimestamp(mtime)
+        self.fingerprint = fingerprint
 
         self.date = get_date(post_meta)
-        self.display_year = str(self.date.year)
-        self.display_month = str(self.date.month).zfill(2)
 
         self.tags = self.get_tags(post_meta)
 
         self.archived = is_archived(post_meta)
-        self.html_path = Path(self.markdown_file.stem)
+
+    @property
+    def desc(self) -> str:
+        return f"{self.title} - {self.subtitle} - {self.author}"
+
+    @property
+    def display_year(self) -> str:
+        return str(self.date.year)
+
+    @property
+    def display_month(self) -> str:
+        return str(self.date.month).zfill(2)
+
+    @property
+    def html_path(self) -> Path:
+        return Path(self.id)
+
+    @property
+    def content(self) -> str:
+        """The markdown body, read from the markdown file for indexed posts."""
+        if self._content is None:
+            self._content = frontmatter.loads(self.markdown_file.read_text()).content
+        return self._content
 
     def get_tags(self, post_meta: Post) -> List[Tag]:
         found_tags = []
@@ -61,7 +109,7 @@ class BlogPost:
             "subtitle": self.subtitle,
             "author": self.author,
             "desc": self.desc,
-            "content": self.content,
+            "content_hash": self.content_hash,
             "markdown_file": str(self.markdown_file),
             "date": self.date.strftime("%Y-%m-%d"),
             "display_year": self.display_year,
@@ -70,15 +118,7 @@ class BlogPost:
             "archived": self.archived,
             "html_path": str(self.html_path),
             "last_modified": self.last_modified.strftime("%Y-%m-%d"),
-            "id": self.id,
-        }
-
-    def to_json_sparse(self):
-        return {
-            "markdown_file": str(self.markdown_file),
-            "date": self.date.strftime("%Y-%m-%d"),
-            "tags": [tag.id for tag in self.tags],
-            "last_modified": self.last_modified.strftime("%Y-%m-%d"),
+            "fingerprint": self.fingerprint,
             "id": self.id,
         }
 
@@ -88,25 +128,17 @@ class BlogPost:
         post.title = data["title"]
         post.subtitle = data["subtitle"]
         post.author = data["author"]
-        post.desc = data["desc"]
-        post.content = data["content"]
+        # indexes written before content_hash existed contain the whole content
+        post._content = data.get("content")
+        if "content_hash" in data:
+            post.content_hash = data["content_hash"]
+        else:
+            post.content_hash = hash_bytes(post._content)
         post.markdown_file = Path(data["markdown_file"])
         post.date = dt.strptime(data["date"], "%Y-%m-%d").date()
-        post.display_year = data["display_year"]
-        post.display_month = data["display_month"]
         post.tags = [Tag.from_json(tag) for tag in data["tags"]]
         post.archived = data["archived"]
-        post.html_path = Path(data["html_path"])
-        post.last_modified = dt.strptime(data["last_modified"], "%Y-%m-%d")
-        post.id = data["id"]
-        return post
-
-    @classmethod
-    def from_json_sparse(cls, data: dict):
-        post = cls.__new__(cls)
-        post.markdown_file = Path(data["markdown_file"])
-        post.date = dt.strptime(data["date"], "%Y-%m-%d").date()
-        post.tags = [Tag(id=tag) for tag in data["tags"]]
         post.last_modified = dt.strptime(data["last_modified"], "%Y-%m-%d")
+        post.fingerprint = data.get("fingerprint", "")
         post.id = data["id"]
         return post
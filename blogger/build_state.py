@@ -0,0 +1,101 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from blogger.utils import atomic_open
+
+StatKey = Tuple[int, int, int]
+
+
+def stat_key(stat: os.stat_result) -> StatKey:
+    """The parts of a stat result that change whenever a file is modified."""
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class BuildState:
+    def __init__(self, build_state_path: Path) -> None:
+        """Stores what the last build has seen, so unchanged files are never opened."""
+        self.build_state_path = build_state_path
+        # source file name -> {"stat": [ino, size, mtime_ns], "hash": str, "skip": bool,
+        # "post": {"fingerprint": str, "title": str, "last_modified": str}}, where
+        # post is what an unchanged post needs of its index record
+        self.sources: Dict[str, dict] = {}
+        # template name -> content hash
+        self.templates: Dict[str, str] = {}
+        # output file relative to the output path -> content hash
+        self.outputs: Dict[str, str] = {}
+        # post id -> [older post id, newer post id] its page was rendered with
+        self.neighbors: Dict[str, List[str | None]] = {}
+        # hash of the entries the sitemap and rss feed were generated from
+        self.feed = ""
+
+    @classmethod
+    def from_json(cls, path: Path):
+        build_state = cls(path)
+        data = json.loads(path.read_text())
+        build_state.sources = data["sources"]
+        build_state.templates = data.get("templates", {})
+        build_state.outputs = data.get("outputs", {})
+        build_state.neighbors = data.get("neighbors", {})
+        build_state.feed = data.get("feed", "")
+        return build_state
+
+    def unchanged_source(self, file: Path, stat: os.stat_result) -> dict | None:
+        """Returns the recorded entry of the file if its stat has not changed."""
+        entry = self.sources.get(file.name)
+        if entry is not None and tuple(entry["stat"]) == stat_key(stat):
+            return entry
+        return None
+
+    def update_source(
+        self, file: Path, stat: os.stat_result, content_hash: str, skip: bool = False
+    ):
+        entry = {
+            "stat": list(stat_key(stat)),
+            "hash": content_hash,
+            "skip": skip,
+        }
+        # a file that was only touched still has the same page
+        old_entry = self.sources.get(file.name)
+        if old_entry and old_entry["hash"] == content_hash and not skip:
+            if "post" in old_entry:
+                entry["post"] = old_entry["post"]
+        self.sources[file.name] = entry
+
+    def record_post(self, post_data: dict) -> dict | None:
+        """
+        Copies the fingerprint, title and last modified date of an index record
+        to the entry of its source file and returns them.
+        """
+        entry = self.sources.get(Path(post_data["markdown_file"]).name)
+        if entry is None:
+            return None
+        entry["post"] = {
+            "fingerprint": post_data["fingerprint"],
+            "title": post_data["title"],
+            "last_modified": post_data["last_modified"],
+        }
+        return entry["post"]
+
+    def prune_sources(self, names: Iterable[str]):
+        """Forgets all source files that are not in names."""
+        names = set(names)
+        self.sources = {
+            name: entry for name, entry in self.sources.items() if name in names
+        }
+
+    def _to_json(self):
+        return json.dumps(
+            {
+                "sources": self.sources,
+                "templates": self.templates,
+                "outputs": self.outputs,
+                "neighbors": self.neighbors,
+                "feed": self.feed,
+            }
+        )
+
+    def to_json(self):
+        with atomic_open(self.build_state_path) as f:
+            f.write(self._to_json())
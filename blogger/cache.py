@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+from typing import Dict
+
+
+class DiskCache:
+    def __init__(self, cache_path: Path, max_size: int | None) -> None:
+        """
+        Content addressed cache of strings on disk.
+        Entries are evicted least recently used first once the cache grows
+        beyond max_size bytes. Without max_size nothing is evicted, which is
+        how render worker processes write to a cache the parent evicts from.
+        """
+        self.cache_path = cache_path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # entry path -> size, scanned lazily on the first write
+        self._sizes: Dict[Path, int] | None = None
+        self._total_size = 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_path / key[:2] / key
+
+    def get(self, key: str) -> str | None:
+        path = self._entry_path(key)
+        try:
+            value = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # mark the entry as recently used
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: str):
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # worker processes may write the same entry at the same time
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(value, encoding="utf-8")
+        os.replace(tmp_path, path)
+        if self.max_size is None:
+            return
+
+        sizes = self._scan()
+        size = path.stat().st_size
+        self._total_size += size - sizes.get(path, 0)
+        sizes[path] = size
+        if self._total_size > self.max_size:
+            self.evict()
+
+    def evict(self, rescan: bool = False):
+        """
+        Removes least recently used entries until the cache fits into max_size.
+        rescan also picks up the entries other processes wrote since the scan.
+        """
+        if self.max_size is None:
+            return
+        if rescan:
+            self._sizes = None
+        sizes = self._scan()
+        entries = []
+        for path in sizes:
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+        for _, path in entries:
+            if self._total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            self._total_size -= sizes.pop(path)
+
+    def _scan(self) -> Dict[Path, int]:
+        if self._sizes is None:
+            self._sizes = {}
+            if self.cache_path.exists():
+                for path in self.cache_path.glob("*/*"):
+                    if path.suffix != ".tmp":
+                        self._sizes[path] = path.stat().st_size
+            self._total_size = sum(self._sizes.values())
+        return self._sizes
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
@@ -8,9 +8,28 @@ class BlogConfig:
     blog_out_path: Path
     tags_path: Path
     blog_index_path: Path
+    build_state_path: Path
+    journal_path: Path
     posts_path: Path
     force_update: bool = False
     media_path: Path = Path("media")
+    # year and month archive pages are written to <blog_out_path>/<archive_path>
+    archive_path: Path = Path("archive")
+    use_cache: bool = True
+    cache_path: Path = Path(".blogger_cache")
+    cache_max_size: int = 256 * 1024 * 1024
+    # pygments highlighted code blocks, shared by all posts and builds
+    highlight_cache_path: Path
+    highlight_cache_max_size: int = 64 * 1024 * 1024
+    # number of processes rendering posts, 0 uses all cores
+    workers: int = 1
+    # "json" or "sqlite", sqlite stores the index in index_db_path
+    index_backend: str = "json"
+    index_db_path: Path
+    # seconds between checkpoints of the index during a build, 0 disables them
+    checkpoint_interval: float = 60
+    # dump cProfile stats of every build stage to <blog_out_path>/profile
+    profile: bool = False
 
     def __init__(self, yaml: dict) -> None:
         self.yaml = yaml
@@ -26,6 +45,55 @@ class BlogConfig:
         if "media_path" in yaml:
             self.media_path = Path(yaml["media_path"])
 
+        if "archive_path" in yaml:
+            self.archive_path = Path(yaml["archive_path"])
+
+        if "build_state_path" in yaml:
+            self.build_state_path = Path(yaml["build_state_path"])
+        else:
+            self.build_state_path = self.blog_index_path.with_name("build_state.json")
+
+        if "journal_path" in yaml:
+            self.journal_path = Path(yaml["journal_path"])
+        else:
+            self.journal_path = self.blog_index_path.with_name("build_journal.jsonl")
+
+        if "checkpoint_interval" in yaml:
+            self.checkpoint_interval = float(yaml["checkpoint_interval"])
+
+        if "index_backend" in yaml:
+            self.index_backend = yaml["index_backend"]
+
+        if "index_db_path" in yaml:
+            self.index_db_path = Path(yaml["index_db_path"])
+        else:
+            self.index_db_path = self.blog_index_path.with_suffix(".sqlite")
+
+        if "use_cache" in yaml:
+            self.use_cache = yaml["use_cache"]
+
+        if "cache_path" in yaml:
+            self.cache_path = Path(yaml["cache_path"])
+
+        if "cache_max_size" in yaml:
+            self.cache_max_size = int(yaml["cache_max_size"])
+
+        if "highlight_cache_path" in yaml:
+            self.highlight_cache_path = Path(yaml["highlight_cache_path"])
+        else:
+            self.highlight_cache_path = self.cache_path.with_name(
+                f"{self.cache_path.name}_highlight"
+            )
+
+        if "highlight_cache_max_size" in yaml:
+            self.highlight_cache_max_size = int(yaml["highlight_cache_max_size"])
+
+        if "workers" in yaml:
+            self.workers = int(yaml["workers"])
+
+        if "profile" in yaml:
+            self.profile = yaml["profile"]
+
     @classmethod
     def from_yaml(cls, path: str | Path):
         path = Path(path)
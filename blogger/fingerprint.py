@@ -0,0 +1,43 @@
+from hashlib import sha256
+from typing import Dict
+
+from blogger import markdown2
+from blogger.conf import BlogConfig
+from blogger.templates import TEMPLATE_DEPENDENCIES
+from blogger.utils import MARKDOWN_EXTRAS, pygments_version
+
+
+def hash_bytes(*parts: bytes | str) -> str:
+    """Hashes the given parts into a single hex digest."""
+    digest = sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def build_fingerprint(config: BlogConfig, template_hashes: Dict[str, str]) -> str:
+    """
+    Fingerprint of everything besides the markdown file itself that
+    influences a rendered post: markdown extras, the markdown2 and pygments
+    versions, config and post templates.
+    """
+    parts = [
+        ",".join(MARKDOWN_EXTRAS),
+        markdown2.__version__,
+        pygments_version(),
+        str(config.posts_path),
+        str(config.tags_path),
+        str(config.media_path),
+    ]
+    for name in TEMPLATE_DEPENDENCIES["post"]:
+        parts.append(name)
+        parts.append(template_hashes[name])
+    return hash_bytes(*parts)
+
+
+def post_fingerprint(content_hash: str, build_fingerprint: str) -> str:
+    """Fingerprint of a single post, changes whenever its rendered page would."""
+    return hash_bytes(content_hash, build_fingerprint)
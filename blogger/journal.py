@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+from typing import Iterator, TextIO
+
+
+class BuildJournal:
+    def __init__(self, journal_path: Path) -> None:
+        """
+        Append only log of the posts a running build has completed since the
+        last checkpoint of the index. The journal is removed once a build
+        finishes, so finding one means the last build was interrupted.
+        """
+        self.journal_path = journal_path
+        self._file: TextIO | None = None
+
+    def exists(self) -> bool:
+        return self.journal_path.exists()
+
+    def replay(self) -> Iterator[dict]:
+        """Yields the recorded index entries in the order they were completed."""
+        if not self.exists():
+            return
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # the build died while writing this entry, the resumed
+                    # build checkpoints and truncates the journal after replay
+                    return
+
+    def append(self, post_data: dict):
+        if self._file is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.journal_path, "a")
+        self._file.write(json.dumps(post_data) + "\n")
+        # flushed right away so the entry survives the process being killed
+        self._file.flush()
+
+    def truncate(self):
+        """Called after a checkpoint, which contains all journaled posts."""
+        if self._file is not None:
+            self._file.truncate(0)
+        elif self.exists():
+            self.journal_path.write_text("")
+
+    def remove(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.journal_path.unlink(missing_ok=True)
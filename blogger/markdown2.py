@@ -116,8 +116,9 @@ import logging
 import re
 import sys
 from collections import defaultdict, OrderedDict
+from functools import cached_property
 from hashlib import sha256
-from random import randint, random
+from random import getrandbits, randint, random
 
 # ---- globals
 
@@ -129,7 +130,8 @@ DEFAULT_TAB_WIDTH = 4
 
 SECRET_SALT = bytes(randint(0, 1000000))
 # MD5 function was previously used for this; the "md5" prefix was kept for
-# backwards compatibility.
+# backwards compatibility. Markdown instances use the cheaper
+# Markdown._hash_text, this is kept for code that imports it.
 def _hash_text(s):
     return 'md5-' + sha256(SECRET_SALT + s.encode("utf-8")).hexdigest()[32:]
 
@@ -195,6 +197,10 @@ class Markdown(object):
 
     _toc = None
 
+    # Optional cache of highlighted code blocks shared between conversions:
+    # an object with get(key) returning a str or None and put(key, html).
+    highlight_cache = None
+
     # Used to track when we're inside an ordered or unordered list
     # (see _ProcessListItems() for details):
     list_level = 0
@@ -270,11 +276,30 @@ class Markdown(object):
         self._outdent_re = re.compile(r'^(\t|[ ]{1,%d})' % tab_width, re.M)
         self.cli = cli
 
-        self._escape_table = g_escape_table.copy()
+        self._reset_placeholders('')
+
+    def _reset_placeholders(self, text):
+        # Placeholders are numbered per conversion behind a random prefix
+        # that does not occur in the text, so they can never collide with it.
+        self._placeholder_prefix = '%016x' % getrandbits(64)
+        while 'md5-' + self._placeholder_prefix in text:
+            self._placeholder_prefix = '%016x' % getrandbits(64)
+        self._placeholders = {}
         self._code_table = {}
-        if "smarty-pants" in self.extras:
-            self._escape_table['"'] = _hash_text('"')
-            self._escape_table["'"] = _hash_text("'")
+        self._escape_table = dict((ch, self._hash_text(ch)) for ch in g_escape_table)
+        if "smarty-pants" in self._instance_extras:
+            self._escape_table['"'] = self._hash_text('"')
+            self._escape_table["'"] = self._hash_text("'")
+
+    def _hash_text(self, s):
+        # Same "md5-" plus 32 hex digits shape as the module level _hash_text,
+        # equal strings get the same placeholder.
+        try:
+            return self._placeholders[s]
+        except KeyError:
+            key = 'md5-%s%016x' % (self._placeholder_prefix, len(self._placeholders))
+            self._placeholders[s] = key
+            return key
 
     def reset(self):
         self.urls = {}
@@ -333,6 +358,8 @@ class Markdown(object):
             # TODO: perhaps shouldn't presume UTF-8 for string input?
             text = str(text, 'utf-8')
 
+        self._reset_placeholders(text)
+
         if self.use_file_vars:
             # Look for emacs-style file variable hints.
             text = self._emacs_oneliner_vars_pat.sub(self._emacs_vars_oneliner_sub, text)
@@ -811,16 +838,16 @@ class Markdown(object):
                 # remove `markdown="1"` attr from tag
                 first_line = first_line[:m.start()] + first_line[m.end():]
                 # hash the HTML segments to protect them
-                f_key = _hash_text(first_line)
+                f_key = self._hash_text(first_line)
                 self.html_blocks[f_key] = first_line
-                l_key = _hash_text(last_line)
+                l_key = self._hash_text(last_line)
                 self.html_blocks[l_key] = last_line
                 return ''.join(["\n\n", f_key,
                     "\n\n", middle, "\n\n",
                     l_key, "\n\n"])
         elif self.extras.get('header-ids', {}).get('mixed') and self._h_tag_re.match(html):
             html = self._h_tag_re.sub(self._h_tag_sub, html)
-        key = _hash_text(html)
+        key = self._hash_text(html)
         self.html_blocks[key] = html
         return "\n\n" + key + "\n\n"
 
@@ -915,7 +942,7 @@ class Markdown(object):
                 html = text[start_idx:end_idx]
                 if raw and self.safe_mode:
                     html = self._sanitize_html(html)
-                key = _hash_text(html)
+                key = self._hash_text(html)
                 self.html_blocks[key] = html
                 text = text[:start_idx] + "\n\n" + key + "\n\n" + text[end_idx:]
 
@@ -1025,18 +1052,19 @@ class Markdown(object):
             self.titles[key] = title
         return ""
 
+    regex_defns = re.compile(r'''
+        \[\#(\w+) # the counter.  Open square plus hash plus a word \1
+        ([^@]*)   # Some optional characters, that aren't an @. \2
+        @(\w+)       # the id.  Should this be normed? \3
+        ([^\]]*)\]   # The rest of the text up to the terminating ] \4
+        ''', re.VERBOSE)
+    regex_subs = re.compile(r"\[@(\w+)\s*\]")  # [@ref_id]
+
     def _do_numbering(self, text):
         ''' We handle the special extension for generic numbering for
             tables, figures etc.
         '''
         # First pass to define all the references
-        self.regex_defns = re.compile(r'''
-            \[\#(\w+) # the counter.  Open square plus hash plus a word \1
-            ([^@]*)   # Some optional characters, that aren't an @. \2
-            @(\w+)       # the id.  Should this be normed? \3
-            ([^\]]*)\]   # The rest of the text up to the terminating ] \4
-            ''', re.VERBOSE)
-        self.regex_subs = re.compile(r"\[@(\w+)\s*\]")  # [@ref_id]
         counters = {}
         references = {}
         replacements = []
@@ -1464,7 +1492,7 @@ class Markdown(object):
         for index, token in enumerate(split_tokens):
             if is_html_markup and not _is_auto_link(token) and not _is_code_span(index, token):
                 sanitized = self._sanitize_html(token)
-                key = _hash_text(sanitized)
+                key = self._hash_text(sanitized)
                 self.html_spans[key] = sanitized
                 tokens.append(key)
             else:
@@ -1581,13 +1609,13 @@ class Markdown(object):
             if mime.startswith('image/') and data_url.group('token') == ';base64':
                 charset='base64'
         url = _html_escape_url(url, safe_mode=self.safe_mode, charset=charset)
-        key = _hash_text(url)
+        key = self._hash_text(url)
         self._escape_table[url] = key
         return key
 
     _safe_protocols = r'(?:https?|ftp):\/\/|(?:mailto|tel):'
 
-    @property
+    @cached_property
     def _safe_href(self):
         '''
         _safe_href is adapted from pagedown's Markdown.Sanitizer.js
@@ -2095,47 +2123,26 @@ class Markdown(object):
         return list_str
 
     def _get_pygments_lexer(self, lexer_name):
-        try:
-            from pygments import lexers, util
-        except ImportError:
-            return None
-        try:
-            return lexers.get_lexer_by_name(lexer_name)
-        except util.ClassNotFound:
-            return None
+        return _pygments_lexer(lexer_name)
 
     def _color_with_pygments(self, codeblock, lexer, **formatter_opts):
         import pygments
-        import pygments.formatters
-
-        class HtmlCodeFormatter(pygments.formatters.HtmlFormatter):
-            def _wrap_code(self, inner):
-                """A function for use in a Pygments Formatter which
-                wraps in <code> tags.
-                """
-                yield 0, "<code>"
-                for tup in inner:
-                    yield tup
-                yield 0, "</code>"
-
-            def _add_newline(self, inner):
-                # Add newlines around the inner contents so that _strict_tag_block_re matches the outer div.
-                yield 0, "\n"
-                yield from inner
-                yield 0, "\n"
-
-            def wrap(self, source, outfile=None):
-                """Return the source with a code, pre, and div."""
-                if outfile is None:
-                    # pygments >= 2.12
-                    return self._add_newline(self._wrap_pre(self._wrap_code(source)))
-                else:
-                    # pygments < 2.12
-                    return self._wrap_div(self._add_newline(self._wrap_pre(self._wrap_code(source))))
 
         formatter_opts.setdefault("cssclass", "codehilite")
-        formatter = HtmlCodeFormatter(**formatter_opts)
-        return pygments.highlight(codeblock, lexer, formatter)
+        formatter_opts = sorted(formatter_opts.items())
+        cache = self.highlight_cache
+        if cache is not None:
+            key = sha256(repr((
+                lexer.name, sorted(lexer.options.items()), formatter_opts,
+                codeblock, pygments.__version__
+            )).encode('utf-8')).hexdigest()
+            html = cache.get(key)
+            if html is not None:
+                return html
+        html = pygments.highlight(codeblock, lexer, _pygments_formatter(*formatter_opts))
+        if cache is not None:
+            cache.put(key, html)
+        return html
 
     def _code_block_sub(self, match, is_fenced_code_block=False):
         lexer_name = None
@@ -2323,7 +2330,7 @@ class Markdown(object):
         ]
         for before, after in replacements:
             text = text.replace(before, after)
-        hashed = _hash_text(text)
+        hashed = self._hash_text(text)
         self._code_table[text] = hashed
         return hashed
 
@@ -2353,7 +2360,7 @@ class Markdown(object):
                 pass
 
         # hash SVG to prevent <> chars being messed with
-        self._escape_table[waves] = _hash_text(waves)
+        self._escape_table[waves] = self._hash_text(waves)
 
         return self._uniform_indent(
             '\n%s%s%s\n' % (open_tag, self._escape_table[waves], close_tag),
@@ -2758,25 +2765,38 @@ class Markdown(object):
                         .replace('*', self._escape_table['*'])
                         .replace('_', self._escape_table['_']))
                 link = '<a href="%s">%s</a>' % (escaped_href, text[start:end])
-                hash = _hash_text(link)
+                hash = self._hash_text(link)
                 link_from_hash[hash] = link
                 text = text[:start] + hash + text[end:]
         for hash, link in list(link_from_hash.items()):
             text = text.replace(hash, link)
         return text
 
+    # Every placeholder produced by _hash_text has this shape.
+    _hash_re = re.compile(r'md5-[0-9a-f]{32}')
+
     def _unescape_special_chars(self, text):
         # Swap back in all the special characters we've hidden.
-        hashmap = tuple(self._escape_table.items()) + tuple(self._code_table.items())
         # html_blocks table is in format {hash: item} compared to usual {item: hash}
-        hashmap += tuple(tuple(reversed(i)) for i in self.html_blocks.items())
-        while True:
-            orig_text = text
-            for ch, hash in hashmap:
-                text = text.replace(hash, ch)
-            if text == orig_text:
-                break
-        return text
+        hashmap = dict(self.html_blocks)
+        hashmap.update((hash, item) for item, hash in self._code_table.items())
+        hashmap.update((hash, ch) for ch, hash in self._escape_table.items())
+
+        # Placeholders are found in a single left to right pass. Placeholders
+        # inside a restored item are restored as well, each item only once.
+        restored = {}
+
+        def restore(match):
+            hash = match.group(0)
+            if hash not in hashmap:
+                return hash
+            if hash not in restored:
+                # an item that contains its own hash keeps it
+                restored[hash] = hash
+                restored[hash] = self._hash_re.sub(restore, hashmap[hash])
+            return restored[hash]
+
+        return self._hash_re.sub(restore, text)
 
     def _outdent(self, text):
         # Remove one level of line-leading tabs or spaces
@@ -3133,6 +3153,60 @@ def _hr_tag_re_from_tab_width(tab_width):
 _hr_tag_re_from_tab_width = _memoized(_hr_tag_re_from_tab_width)
 
 
+# Lexers and formatters keep no state between highlight() calls, so the code
+# blocks of all conversions share them instead of looking up a lexer and
+# creating a formatter class and instance for every block.
+def _pygments_lexer(lexer_name):
+    try:
+        from pygments import lexers, util
+    except ImportError:
+        return None
+    try:
+        return lexers.get_lexer_by_name(lexer_name)
+    except util.ClassNotFound:
+        return None
+_pygments_lexer = _memoized(_pygments_lexer)
+
+
+def _html_code_formatter_class():
+    import pygments.formatters
+
+    class HtmlCodeFormatter(pygments.formatters.HtmlFormatter):
+        def _wrap_code(self, inner):
+            """A function for use in a Pygments Formatter which
+            wraps in <code> tags.
+            """
+            yield 0, "<code>"
+            for tup in inner:
+                yield tup
+            yield 0, "</code>"
+
+        def _add_newline(self, inner):
+            # Add newlines around the inner contents so that _strict_tag_block_re matches the outer div.
+            yield 0, "\n"
+            yield from inner
+            yield 0, "\n"
+
+        def wrap(self, source, outfile=None):
+            """Return the source with a code, pre, and div."""
+            if outfile is None:
+                # pygments >= 2.12
+                return self._add_newline(self._wrap_pre(self._wrap_code(source)))
+            else:
+                # pygments < 2.12
+                return self._wrap_div(self._add_newline(self._wrap_pre(self._wrap_code(source))))
+
+    return HtmlCodeFormatter
+_html_code_formatter_class = _memoized(_html_code_formatter_class)
+
+
+def _pygments_formatter(*formatter_opts):
+    """HtmlCodeFormatter for the sorted (name, value) option pairs. Options
+    with unhashable values, like a list of hl_lines, get a new formatter."""
+    return _html_code_formatter_class()(**dict(formatter_opts))
+_pygments_formatter = _memoized(_pygments_formatter)
+
+
 def _xml_escape_attr(attr, skip_single_quote=True):
     """Escape the given string for use in an HTML/XML tag attribute.
 
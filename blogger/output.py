@@ -0,0 +1,92 @@
+import shutil
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, Set
+
+
+class OutputWriter:
+    def __init__(self, output_path: Path, hashes: Dict[str, str]) -> None:
+        """
+        Writes files below the output path, but only if their content changed.
+        hashes maps paths relative to the output path to the hash of the
+        content that was last written there and is updated in place.
+        """
+        self.output_path = output_path
+        self.hashes = hashes
+        # every file this build has written or kept
+        self.produced: Set[str] = set()
+        self.written = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    def _key(self, path: Path) -> str:
+        return path.relative_to(self.output_path).as_posix()
+
+    def write(self, path: Path, content: str | bytes):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest = sha256(content).hexdigest()
+        key = self._key(path)
+        self.produced.add(key)
+
+        if path.exists():
+            recorded = self.hashes.get(key)
+            if recorded is None:
+                recorded = sha256(path.read_bytes()).hexdigest()
+            if recorded == digest:
+                self.hashes[key] = digest
+                self.skipped += 1
+                return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        self.hashes[key] = digest
+        self.written += 1
+
+    def keep(self, path: Path):
+        """Marks an existing file as part of this build without writing it."""
+        self.keep_key(self._key(path))
+
+    def keep_key(self, key: str):
+        """Like keep, for a path that is already relative to the output path."""
+        self.produced.add(key)
+
+    def recorded(self, key: str) -> bool:
+        """Checks if an earlier build wrote the file at key and it was not removed."""
+        return key in self.hashes
+
+    def remove(self, path: Path):
+        """Removes a file or a whole directory and forgets its hashes."""
+        if path.is_dir():
+            shutil.rmtree(path)
+            prefix = self._key(path) + "/"
+            for key in [key for key in self.hashes if key.startswith(prefix)]:
+                del self.hashes[key]
+                self.produced.discard(key)
+        elif path.exists():
+            path.unlink()
+            self.hashes.pop(self._key(path), None)
+            self.produced.discard(self._key(path))
+        else:
+            return
+        self.deleted += 1
+
+    def remove_stale(self):
+        """
+        Removes every file that an earlier build wrote but this one did not
+        produce, together with directories that end up empty.
+        """
+        for key in sorted(set(self.hashes) - self.produced):
+            path = self.output_path / key
+            if path.exists():
+                self.remove(path)
+            else:
+                del self.hashes[key]
+
+            parent = path.parent
+            while parent != self.output_path and parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+
+    def stats(self) -> str:
+        return f"{self.written} written, {self.skipped} unchanged, {self.deleted} deleted"
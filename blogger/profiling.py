@@ -0,0 +1,157 @@
+import cProfile
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter, process_time
+from typing import Callable, List, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+
+def current_rss() -> int | None:
+    """Resident set size of this process in bytes, None where /proc is missing."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss() -> int | None:
+    """Peak resident set size of this process in bytes, None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _growth(before: int | None, after: int | None) -> int | None:
+    if before is None or after is None:
+        return None
+    return after - before
+
+
+def _total(sizes) -> int | None:
+    sizes = list(sizes)
+    if not sizes or None in sizes:
+        return None
+    return sum(sizes)
+
+
+def _megabytes(size: int | None) -> str:
+    return "" if size is None else f"{size / 2**20:+.1f}"
+
+
+def timed_call(func: Callable, *args) -> Tuple[object, float, float]:
+    """Calls func and returns its result together with the wall and cpu time."""
+    wall, cpu = perf_counter(), process_time()
+    result = func(*args)
+    return result, perf_counter() - wall, process_time() - cpu
+
+
+class Timing:
+    def __init__(
+        self,
+        name: str,
+        wall: float,
+        cpu: float,
+        rss_growth: int | None = None,
+        peak_growth: int | None = None,
+    ) -> None:
+        """
+        rss_growth is how much the resident memory grew during the timed
+        call, peak_growth how much it raised the peak of the process.
+        """
+        self.name = name
+        self.wall = wall
+        self.cpu = cpu
+        self.rss_growth = rss_growth
+        self.peak_growth = peak_growth
+
+    def row(self) -> str:
+        return (
+            f"{self.name:<40} {self.wall:>9.3f} {self.cpu:>9.3f} "
+            f"{_megabytes(self.rss_growth):>10} {_megabytes(self.peak_growth):>10}"
+        )
+
+
+class BuildProfiler:
+    def __init__(self, profile_path: Path | None = None) -> None:
+        """
+        Records wall time and cpu time of build stages and posts, and how
+        much each stage grew the resident memory and its peak.
+        If a profile path is given every stage is also run under cProfile and
+        its stats are dumped to <profile_path>/<stage>.prof.
+        """
+        self.profile_path = profile_path
+        self.stages: List[Timing] = []
+        self.posts: List[Timing] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        profiler = cProfile.Profile() if self.profile_path else None
+        rss, peak = current_rss(), peak_rss()
+        wall, cpu = perf_counter(), process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+                self.profile_path.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(self.profile_path / f"{name}.prof")
+            self.stages.append(
+                Timing(
+                    name,
+                    perf_counter() - wall,
+                    process_time() - cpu,
+                    _growth(rss, current_rss()),
+                    _growth(peak, peak_rss()),
+                )
+            )
+
+    def post(self, name: str, func: Callable, *args):
+        """Calls func for a post in this process and records its time and memory."""
+        rss, peak = current_rss(), peak_rss()
+        result, wall, cpu = timed_call(func, *args)
+        self.posts.append(
+            Timing(
+                name, wall, cpu, _growth(rss, current_rss()), _growth(peak, peak_rss())
+            )
+        )
+        return result
+
+    def add_post(self, name: str, wall: float, cpu: float):
+        """Records a post that was converted in a worker process, without its memory."""
+        self.posts.append(Timing(name, wall, cpu))
+
+    def summary(self, slowest_posts: int = 10) -> str:
+        header = (
+            f"{'':<40} {'wall (s)':>9} {'cpu (s)':>9} "
+            f"{'rss (MB)':>10} {'peak (MB)':>10}"
+        )
+        lines = [f"{'STAGE':<40}" + header[40:]]
+        lines += [timing.row() for timing in self.stages]
+        lines.append(
+            Timing(
+                "total",
+                sum(timing.wall for timing in self.stages),
+                sum(timing.cpu for timing in self.stages),
+                _total(timing.rss_growth for timing in self.stages),
+                _total(timing.peak_growth for timing in self.stages),
+            ).row()
+        )
+
+        if self.posts:
+            slowest = sorted(self.posts, key=lambda timing: timing.wall, reverse=True)
+            lines.append("")
+            lines.append(f"{'SLOWEST POSTS':<40}" + header[40:])
+            lines += [timing.row().rstrip() for timing in slowest[:slowest_posts]]
+        return "\n".join(lines)
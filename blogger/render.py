@@ -1,12 +1,17 @@
-from typing import List
+import calendar
+import threading
+from pathlib import Path
+from typing import List, Tuple
 
 from blogger import markdown2
-from blogger.blog_index import BlogIndex
+from blogger.blog_index import PostIndex
 from blogger.blogpost import BlogPost
+from blogger.cache import DiskCache
 from blogger.conf import BlogConfig
+from blogger.fingerprint import hash_bytes
 from blogger.tag import Tag
 from blogger.templates import Header, Templates
-from blogger.utils import MARKDOWN_EXTRAS
+from blogger.utils import MARKDOWN_EXTRAS, pygments_version
 
 
 def _valid_tag_name(tag_name: str) -> bool:
@@ -40,32 +45,144 @@ def render_blog_list(posts: List[BlogPost], config: BlogConfig) -> str:
 
 
 def render_tag_page(tag: Tag, posts: List[BlogPost], config: BlogConfig) -> str:
-    posts = sorted(posts, key=lambda x: x.date, reverse=True)
+    """Expects the posts newest first, as PostIndex.posts_with_tag returns them."""
+    return _render_post_list_page(tag.name, config.tags_path / tag.id, posts, config)
+
+
+def render_archive_page(
+    year: int, month: int | None, posts: List[BlogPost], config: BlogConfig
+) -> str:
+    """The page of all posts of a year or of a month, rendered like a tag page."""
+    if month is None:
+        return _render_post_list_page(
+            str(year), config.archive_path / str(year), posts, config
+        )
+    return _render_post_list_page(
+        f"{calendar.month_name[month]} {year}",
+        config.archive_path / str(year) / f"{month:02d}",
+        posts,
+        config,
+    )
+
+
+def _render_post_list_page(
+    name: str, path: Path, posts: List[BlogPost], config: BlogConfig
+) -> str:
     post_list = render_blog_list(posts, config)
     meta = Templates.meta().render(
-        title=tag.name,
-        description=tag.name
+        title=name,
+        description=name
         + " |  Marc Julian Schwarz - Data Scientist at AHEAD Automotive GmbH",
         author="Marc Julian Schwarz",
-        keywords=tag.name,
-        canonical=f"https://marc-julian.com/blog/{config.tags_path / tag.id}",
+        keywords=name,
+        canonical=f"https://marc-julian.com/blog/{path}",
     )
     return Templates.tag_page().render(
-        name=tag.name,
+        name=name,
         count=len(posts),
         post_list=post_list,
         header=Header().render(),
         meta=meta,
-        title=tag.name,
+        title=name,
     )
 
 
-def render_blog_post(post: BlogPost, config: BlogConfig) -> str:
-    html = markdown2.markdown(
-        post.content,
-        extras=MARKDOWN_EXTRAS,
+def markdown_cache_key(post: BlogPost) -> str:
+    return hash_bytes(
+        post.content_hash,
+        ",".join(MARKDOWN_EXTRAS),
+        markdown2.__version__,
+        pygments_version(),
     )
 
+
+# cache of highlighted code blocks the converters of this process use
+_highlight_cache: DiskCache | None = None
+
+
+def use_highlight_cache(cache: DiskCache | None):
+    """Also the initializer of render worker processes, which get a copy of the cache."""
+    global _highlight_cache
+    _highlight_cache = cache
+
+
+# extras -> converter, per thread since a converter keeps state while it converts
+_converters = threading.local()
+
+
+def markdown_converter(extras: Tuple[str, ...]) -> markdown2.Markdown:
+    """
+    Returns the converter of this thread for the extras. Converters reset
+    themselves before every conversion, so building one (parsing the extras,
+    compiling its regexes) only happens once per process and thread.
+    """
+    converters = getattr(_converters, "by_extras", None)
+    if converters is None:
+        converters = _converters.by_extras = {}
+    converter = converters.get(extras)
+    if converter is None:
+        converter = converters[extras] = markdown2.Markdown(extras=list(extras))
+    return converter
+
+
+def render_markdown(content: str) -> str:
+    converter = markdown_converter(tuple(MARKDOWN_EXTRAS))
+    converter.highlight_cache = _highlight_cache
+    return converter.convert(content)
+
+
+def render_markdown_counted(content: str) -> Tuple[str, int, int]:
+    """
+    render_markdown for the render process pool. Also returns the highlight
+    cache hits and misses of the conversion, the parent adds them to its own.
+    """
+    cache = _highlight_cache
+    if cache is None:
+        return render_markdown(content), 0, 0
+    hits, misses = cache.hits, cache.misses
+    html = render_markdown(content)
+    return html, cache.hits - hits, cache.misses - misses
+
+
+def render_blog_post(
+    post: BlogPost, config: BlogConfig, cache: DiskCache | None = None, nav: str = ""
+) -> str:
+    """Renders the post, reusing its cached markdown conversion if possible."""
+    html = cache and cache.get(markdown_cache_key(post))
+    if html is None:
+        html = render_markdown(post.content)
+        if cache:
+            cache.put(markdown_cache_key(post), html)
+    return render_post_page(post, html, config, nav)
+
+
+def render_post_nav(
+    older: Tuple[str, str] | None, newer: Tuple[str, str] | None, config: BlogConfig
+) -> str:
+    """
+    Links to the previous (older) and next (newer) post, both given as
+    (post id, title) so rendering them needs no BlogPost.
+    """
+    nav_html = ""
+    for neighbor, direction, label in [
+        (older, "previous", "Previous post"),
+        (newer, "next", "Next post"),
+    ]:
+        if neighbor:
+            post_id, title = neighbor
+            nav_html += Templates.post_nav().render(
+                direction=direction,
+                label=label,
+                title=title,
+                link=f"/blog/{config.posts_path / post_id}",
+            )
+    return nav_html
+
+
+def render_post_page(
+    post: BlogPost, html: str, config: BlogConfig, nav: str = ""
+) -> str:
+    """Wraps the converted markdown of a post into the post template."""
     html = html.replace('src="/images/', f'src="/blog/{config.media_path}/')
 
     tag_list = render_tag_list(post.tags, config=config)
@@ -85,6 +202,7 @@ def render_blog_post(post: BlogPost, config: BlogConfig) -> str:
         author=post.author,
         date=post.date.strftime("%d.%m.%Y") or "",
         tags=tag_list,
+        nav=nav,
         meta=meta,
         header=Header.render(),
     )
@@ -92,12 +210,9 @@ def render_blog_post(post: BlogPost, config: BlogConfig) -> str:
     return post_html
 
 
-def render_index(blog_index: BlogIndex, config: BlogConfig) -> str:
-    archived_posts = [post for post in blog_index.posts if post.archived]
-    non_archived_posts = [post for post in blog_index.posts if not post.archived]
-
-    non_archived_posts = sorted(non_archived_posts, key=lambda x: x.date, reverse=True)
-    archived_posts = sorted(archived_posts, key=lambda x: x.date, reverse=True)
+def render_index(blog_index: PostIndex, config: BlogConfig) -> str:
+    archived_posts = blog_index.sorted_posts(archived=True)
+    non_archived_posts = blog_index.sorted_posts(archived=False)
 
     post_list = render_blog_list(non_archived_posts, config)
     archived_post_list = render_blog_list(archived_posts, config)
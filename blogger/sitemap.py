@@ -21,7 +21,9 @@ class Sitemap:
         child_url.appendChild(child_lastmod)
         self.base.appendChild(child_url)
 
+    def to_xml(self) -> str:
+        return self.doc.toxml()
+
     def save_sitemap(self, output: Path):
         """Saves the sitemap to the output path"""
-        xml = self.doc.toxml()
-        (output / "sitemap.xml").write_text(xml)
+        (output / "sitemap.xml").write_text(self.to_xml())
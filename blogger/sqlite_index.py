@@ -0,0 +1,318 @@
+import json
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Set, Tuple
+
+from blogger.blog_index import PostIndex, iter_json_array
+from blogger.blogpost import BlogPost
+from blogger.tag import Tag
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    archived INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    name TEXT NOT NULL,
+    color TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (name, color)
+);
+CREATE TABLE IF NOT EXISTS post_tags (
+    post_id TEXT NOT NULL REFERENCES posts (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    color TEXT NOT NULL,
+    tag_id TEXT NOT NULL,
+    PRIMARY KEY (post_id, name, color)
+);
+-- also serves the lookups by date alone, which replaced posts_date
+DROP INDEX IF EXISTS posts_date;
+CREATE INDEX IF NOT EXISTS posts_date_position ON posts (date, position);
+-- the next position is MAX(position) + 1, without an index every insert scans the table
+CREATE INDEX IF NOT EXISTS posts_position ON posts (position);
+CREATE INDEX IF NOT EXISTS posts_archived_date ON posts (archived, date);
+CREATE INDEX IF NOT EXISTS posts_year ON posts (year);
+CREATE INDEX IF NOT EXISTS tags_id ON tags (id);
+CREATE INDEX IF NOT EXISTS post_tags_tag_id ON post_tags (tag_id);
+CREATE INDEX IF NOT EXISTS post_tags_name_color ON post_tags (name, color);
+"""
+
+# newest first, ties in insertion order like a stable sort of the json index
+DATE_ORDER = "ORDER BY date DESC, position ASC"
+
+
+class SqliteBlogIndex(PostIndex):
+    def __init__(self, blog_index_path: Path, db_path: Path) -> None:
+        """
+        Blog index stored in a sqlite database. Every change is a single row
+        upsert or delete, so nothing has to be loaded up front or rewritten at
+        the end of a build. blog_index_path is where to_json exports to.
+        """
+        super().__init__(blog_index_path)
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, blog_index_path: Path, db_path: Path):
+        """Opens the database and imports an existing json index into a new one."""
+        blog_index = cls(blog_index_path, db_path)
+        if blog_index.is_empty() and blog_index_path.exists():
+            with blog_index.db:
+                for post_data in iter_json_array(blog_index_path, "posts"):
+                    blog_index._upsert(BlogPost.from_json(post_data))
+        return blog_index
+
+    def is_empty(self) -> bool:
+        return self.db.execute("SELECT 1 FROM posts LIMIT 1").fetchone() is None
+
+    def _select_posts(
+        self, where: str = "", params: tuple = (), order: str = "ORDER BY position"
+    ) -> List[BlogPost]:
+        rows = self.db.execute(f"SELECT data FROM posts {where} {order}", params)
+        return [BlogPost.from_json(json.loads(data)) for (data,) in rows]
+
+    @property
+    def posts(self) -> List[BlogPost]:
+        return self._select_posts()
+
+    @posts.setter
+    def posts(self, posts: List[BlogPost]):
+        with self.db:
+            self.db.execute("DELETE FROM posts")
+            self.db.execute("DELETE FROM tags")
+            for post in posts:
+                self._upsert(post)
+
+    @property
+    def tags(self) -> Set[Tag]:
+        rows = self.db.execute("SELECT name, color FROM tags")
+        return {Tag(name=name, color=color) for name, color in rows}
+
+    def post_ids(self) -> List[str]:
+        rows = self.db.execute("SELECT id FROM posts ORDER BY position")
+        return [post_id for (post_id,) in rows]
+
+    def get_post(self, post_id: str) -> BlogPost | None:
+        posts = self._select_posts("WHERE id = ?", (post_id,))
+        return posts[0] if posts else None
+
+    def get_title(self, post_id: str) -> str | None:
+        row = self.db.execute(
+            "SELECT json_extract(data, '$.title') FROM posts WHERE id = ?", (post_id,)
+        )
+        found = row.fetchone()
+        return found and found[0]
+
+    def get_record(self, post_id: str) -> dict | None:
+        row = self.db.execute("SELECT data FROM posts WHERE id = ?", (post_id,))
+        found = row.fetchone()
+        return found and json.loads(found[0])
+
+    def post_in_index(self, post: BlogPost) -> bool:
+        row = self.db.execute("SELECT 1 FROM posts WHERE id = ?", (post.id,))
+        return row.fetchone() is not None
+
+    def add_post(self, post: BlogPost):
+        with self.db:
+            self._upsert(post)
+
+    def _upsert(self, post: BlogPost):
+        old_tags = self._post_tags(post.id)
+        self.db.execute(
+            """
+            INSERT INTO posts (id, position, date, year, archived, fingerprint, data)
+            VALUES (?, (SELECT COALESCE(MAX(position), 0) + 1 FROM posts), ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                date = excluded.date,
+                year = excluded.year,
+                archived = excluded.archived,
+                fingerprint = excluded.fingerprint,
+                data = excluded.data
+            """,
+            (
+                post.id,
+                post.date.strftime("%Y-%m-%d"),
+                post.date.year,
+                int(bool(post.archived)),
+                post.fingerprint,
+                json.dumps(post.to_json()),
+            ),
+        )
+        new_tags = set(post.tags)
+        for tag in new_tags - old_tags:
+            self.db.execute(
+                "INSERT OR IGNORE INTO tags (name, color, id) VALUES (?, ?, ?)",
+                (tag.name, tag.color, tag.id),
+            )
+            self.db.execute(
+                "INSERT INTO post_tags (post_id, name, color, tag_id) VALUES (?, ?, ?, ?)",
+                (post.id, tag.name, tag.color, tag.id),
+            )
+        for tag in old_tags - new_tags:
+            self.db.execute(
+                "DELETE FROM post_tags WHERE post_id = ? AND name = ? AND color = ?",
+                (post.id, tag.name, tag.color),
+            )
+            self._release_tag(tag)
+
+    def _post_tags(self, post_id: str) -> Set[Tag]:
+        rows = self.db.execute(
+            "SELECT name, color FROM post_tags WHERE post_id = ?", (post_id,)
+        )
+        return {Tag(name=name, color=color) for name, color in rows}
+
+    def _release_tag(self, tag: Tag):
+        in_use = self.db.execute(
+            "SELECT 1 FROM post_tags WHERE name = ? AND color = ? LIMIT 1",
+            (tag.name, tag.color),
+        ).fetchone()
+        if in_use is None:
+            self.db.execute(
+                "DELETE FROM tags WHERE name = ? AND color = ?", (tag.name, tag.color)
+            )
+            self._unused_tags.append(tag)
+
+    def remove_post(self, post: BlogPost) -> bool:
+        with self.db:
+            old_tags = self._post_tags(post.id)
+            deleted = self.db.execute("DELETE FROM posts WHERE id = ?", (post.id,))
+            if deleted.rowcount == 0:
+                return False
+            # post_tags rows are removed by the foreign key cascade
+            for tag in old_tags:
+                self._release_tag(tag)
+        return True
+
+    @staticmethod
+    def _tag_condition(tag_id: str) -> Tuple[str, tuple]:
+        """
+        Condition of the posts with the tag. The year is only compared for
+        numeric tags, an OR on every tag keeps sqlite from using the indexes.
+        """
+        condition = "id IN (SELECT post_id FROM post_tags WHERE tag_id = ?)"
+        if tag_id.isnumeric():
+            return f"({condition} OR year = ?)", (tag_id, int(tag_id))
+        return condition, (tag_id,)
+
+    def posts_with_tag(self, tag_id: str) -> List[BlogPost]:
+        condition, params = self._tag_condition(tag_id)
+        return self._select_posts(f"WHERE {condition}", params, DATE_ORDER)
+
+    def sorted_posts(self, archived: bool | None = None) -> List[BlogPost]:
+        if archived is None:
+            return self._select_posts(order=DATE_ORDER)
+        return self._select_posts("WHERE archived = ?", (int(archived),), DATE_ORDER)
+
+    def recent_posts(self, count: int) -> List[BlogPost]:
+        return self._select_posts(
+            "WHERE archived = 0", (), f"{DATE_ORDER} LIMIT {int(count)}"
+        )
+
+    def neighbors(self, post_id: str) -> Tuple[str | None, str | None]:
+        row = self.db.execute(
+            "SELECT date, position FROM posts WHERE id = ?", (post_id,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        post_date, position = row
+        # a neighbor of the same date first, else the nearest post of the next
+        # date. Each lookup is a single step on posts_date_position, a combined
+        # OR condition would sort every older or newer post
+        older = self._first_id(
+            "date = ? AND position > ? ORDER BY position ASC", (post_date, position)
+        ) or self._first_id(
+            "date = (SELECT date FROM posts WHERE date < ? ORDER BY date DESC LIMIT 1) "
+            "ORDER BY position ASC",
+            (post_date,),
+        )
+        newer = self._first_id(
+            "date = ? AND position < ? ORDER BY position DESC", (post_date, position)
+        ) or self._first_id(
+            "date = (SELECT date FROM posts WHERE date > ? ORDER BY date ASC LIMIT 1) "
+            "ORDER BY position DESC",
+            (post_date,),
+        )
+        return older, newer
+
+    def _first_id(self, condition: str, params: tuple) -> str | None:
+        row = self.db.execute(
+            f"SELECT id FROM posts WHERE {condition} LIMIT 1", params
+        ).fetchone()
+        return row and row[0]
+
+    def years(self) -> List[int]:
+        rows = self.db.execute("SELECT DISTINCT year FROM posts ORDER BY year")
+        return [year for (year,) in rows]
+
+    def months(self) -> List[Tuple[int, int]]:
+        rows = self.db.execute(
+            "SELECT DISTINCT year, CAST(substr(date, 6, 2) AS INTEGER) AS month "
+            "FROM posts ORDER BY year, month"
+        )
+        return [(year, month) for year, month in rows]
+
+    def query(
+        self,
+        tag: str | None = None,
+        year: int | None = None,
+        month: int | None = None,
+        start: date | None = None,
+        end: date | None = None,
+        archived: bool | None = None,
+    ) -> List[BlogPost]:
+        conditions, params = [], []
+        if tag is not None:
+            condition, tag_params = self._tag_condition(tag)
+            conditions.append(condition)
+            params += tag_params
+        if year is not None:
+            conditions.append("year = ?")
+            params.append(year)
+        if month is not None:
+            conditions.append("substr(date, 6, 2) = ?")
+            params.append(f"{month:02d}")
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(start.strftime("%Y-%m-%d"))
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(end.strftime("%Y-%m-%d"))
+        if archived is not None:
+            conditions.append("archived = ?")
+            params.append(int(archived))
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return self._select_posts(where, tuple(params), DATE_ORDER)
+
+    def remove_unused_tags(self) -> List[Tag]:
+        unused_tags = []
+        for tag in dict.fromkeys(self._unused_tags):
+            used = self.db.execute(
+                "SELECT 1 FROM post_tags WHERE tag_id = ? LIMIT 1", (tag.id,)
+            ).fetchone()
+            if used is None and not (tag.id.isnumeric() and self._has_year(int(tag.id))):
+                unused_tags.append(tag)
+        self._unused_tags = []
+        return unused_tags
+
+    def _has_year(self, year: int) -> bool:
+        row = self.db.execute("SELECT 1 FROM posts WHERE year = ? LIMIT 1", (year,))
+        return row.fetchone() is not None
+
+    def _json_posts(self) -> Iterator[str]:
+        for (data,) in self.db.execute("SELECT data FROM posts ORDER BY position"):
+            yield data
+
+    def save(self):
+        """Everything is written as it changes, only commit what is pending."""
+        self.db.commit()
@@ -1,14 +1,31 @@
+from typing import Dict, Tuple
+
+
 class Tag:
-    def __init__(self, name: str | int, color: str) -> None:
-        self.name = str(name)
-        self.color = color
-        self.id = self.name.replace(" ", "-").lower()
+    # tags are immutable and interned, every (name, color) pair exists only once
+    __slots__ = ("name", "color", "id", "_hash")
+    _interned: Dict[Tuple[str, str], "Tag"] = {}
+
+    def __new__(cls, name: str | int, color: str) -> "Tag":
+        name = str(name)
+        tag = cls._interned.get((name, color))
+        if tag is None:
+            tag = super().__new__(cls)
+            tag.name = name
+            tag.color = color
+            tag.id = name.replace(" ", "-").lower()
+            tag._hash = hash(name) + hash(color)
+            cls._interned[(name, color)] = tag
+        return tag
+
+    def __reduce__(self):
+        return Tag, (self.name, self.color)
 
     def __hash__(self):
-        return hash(self.name) + hash(self.color)
+        return self._hash
 
     def __eq__(self, o: object) -> bool:
-        return self.name == o.name and self.color == o.color
+        return self is o or (self.name == o.name and self.color == o.color)
 
     def lower(self):
         return self.name.lower()
@@ -1,9 +1,41 @@
 from functools import cache
+from hashlib import sha256
+from typing import Dict, Set
+
+TEMPLATES_PATH = "templates"
+
+# the templates each kind of page is rendered with
+TEMPLATE_DEPENDENCIES = {
+    "post": ["post", "meta", "header", "tag", "post_nav"],
+    "index": ["index", "post_list_entry", "tag", "header"],
+    "tag_page": ["tag_page", "post_list_entry", "meta", "header"],
+    "archive": ["tag_page", "post_list_entry", "meta", "header"],
+    "recent_posts": ["post_list_entry"],
+}
 
 
 def read_template(name: str):
     """Reads a template from the temmplates folder"""
-    return open(f"templates/{name}.html", "r").read()
+    return open(f"{TEMPLATES_PATH}/{name}.html", "r").read()
+
+
+def template_hashes() -> Dict[str, str]:
+    """Hashes the content of every template that is used by a page."""
+    names = sorted({name for deps in TEMPLATE_DEPENDENCIES.values() for name in deps})
+    return {
+        name: sha256(read_template(name).encode("utf-8")).hexdigest()
+        for name in names
+    }
+
+
+def stale_page_kinds(old_hashes: Dict[str, str], new_hashes: Dict[str, str]) -> Set[str]:
+    """Returns the kinds of pages that use a template which has changed."""
+    changed = {name for name in new_hashes if old_hashes.get(name) != new_hashes[name]}
+    return {
+        kind
+        for kind, names in TEMPLATE_DEPENDENCIES.items()
+        if any(name in changed for name in names)
+    }
 
 
 class Template:
@@ -52,6 +84,18 @@ class Templates:
     def tag_page():
         return Template("tag_page")
 
+    @staticmethod
+    @cache
+    def post_nav():
+        return Template("post_nav")
+
+    @classmethod
+    def clear_cache(cls):
+        """Forgets all loaded templates, e.g. after a template file changed."""
+        for names in TEMPLATE_DEPENDENCIES.values():
+            for name in names:
+                getattr(cls, name).cache_clear()
+
 
 class Header:
     @staticmethod
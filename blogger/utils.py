@@ -1,7 +1,10 @@
 import http.server
 import os
+from contextlib import contextmanager
 from datetime import datetime as dt
 from enum import Enum
+from functools import cache
+from pathlib import Path
 
 from frontmatter import Post
 
@@ -28,6 +31,16 @@ MARKDOWN_EXTRAS = [
 ]
 
 
+@cache
+def pygments_version() -> str:
+    """Version of pygments, which markdown2 highlights code blocks with, "" without it."""
+    try:
+        import pygments
+    except ImportError:
+        return ""
+    return pygments.__version__
+
+
 def is_skip(post: Post) -> bool:
     if has_property(BLOG_SKIP_KEY, post):
         return post[BLOG_SKIP_KEY]
@@ -75,6 +88,24 @@ def get_date(post: Post):
         return date[0]
 
 
+@contextmanager
+def atomic_open(path: Path, mode: str = "w"):
+    """
+    Opens a temporary file that replaces path once it was written completely,
+    so an interrupted write never leaves a truncated file behind.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
 def create_http_handler(directory):
     class Handler(http.server.SimpleHTTPRequestHandler):
         def __init__(self, *args, **kwargs):
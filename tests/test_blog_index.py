@@ -0,0 +1,146 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+from frontmatter import Post
+
+from blogger.blog_index import BlogIndex
+from blogger.blogpost import BlogPost
+from blogger.constants import (
+    BLOG_ARCHIVED_KEY,
+    BLOG_DATE_KEY,
+    BLOG_TAGS_KEY,
+    BLOG_TITLE_KEY,
+)
+from blogger.sqlite_index import SqliteBlogIndex
+
+
+def make_post(
+    post_id: str, post_date: date, tags=(), archived: bool = False
+) -> BlogPost:
+    post_meta = Post(
+        f"Content of {post_id}.",
+        **{
+            BLOG_TITLE_KEY: post_id.upper(),
+            BLOG_DATE_KEY: post_date,
+            BLOG_TAGS_KEY: list(tags),
+            BLOG_ARCHIVED_KEY: archived,
+        },
+    )
+    return BlogPost(post_meta, Path(f"{post_id}.md"), mtime=0)
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def blog_index(request, tmp_path):
+    if request.param == "sqlite":
+        blog_index = SqliteBlogIndex(tmp_path / "blog_index.json", tmp_path / "db")
+        yield blog_index
+        blog_index.db.close()
+    else:
+        yield BlogIndex(tmp_path / "blog_index.json")
+
+
+def ids(posts):
+    return [post.id for post in posts]
+
+
+def add_posts(blog_index):
+    for post in [
+        make_post("a", date(2021, 3, 1), ["python"]),
+        make_post("b", date(2022, 1, 5), ["python", "rust"]),
+        make_post("c", date(2021, 3, 1), ["rust"], archived=True),
+        make_post("d", date(2020, 7, 9)),
+        make_post("e", date(2021, 3, 1), ["python"]),
+    ]:
+        blog_index.add_post(post)
+
+
+def test_sorted_posts_newest_first(blog_index):
+    add_posts(blog_index)
+    # posts of the same date stay in insertion order
+    assert ids(blog_index.sorted_posts()) == ["b", "a", "c", "e", "d"]
+    assert ids(blog_index.sorted_posts(archived=True)) == ["c"]
+    assert ids(blog_index.sorted_posts(archived=False)) == ["b", "a", "e", "d"]
+    assert ids(blog_index.recent_posts(2)) == ["b", "a"]
+    assert ids(blog_index.recent_posts(0)) == []
+
+
+def test_posts_with_tag(blog_index):
+    add_posts(blog_index)
+    assert ids(blog_index.posts_with_tag("python")) == ["b", "a", "e"]
+    assert ids(blog_index.posts_with_tag("rust")) == ["b", "c"]
+    # every post is tagged with its year
+    assert ids(blog_index.posts_with_tag("2021")) == ["a", "c", "e"]
+    assert ids(blog_index.posts_with_tag("unknown")) == []
+
+
+def test_views_follow_replaced_and_removed_posts(blog_index):
+    add_posts(blog_index)
+    blog_index.add_post(make_post("a", date(2023, 2, 2), ["go"], archived=True))
+    blog_index.remove_post(make_post("b", date(2022, 1, 5)))
+
+    assert ids(blog_index.sorted_posts()) == ["a", "c", "e", "d"]
+    assert ids(blog_index.sorted_posts(archived=True)) == ["a", "c"]
+    assert ids(blog_index.posts_with_tag("python")) == ["e"]
+    assert ids(blog_index.posts_with_tag("go")) == ["a"]
+    assert ids(blog_index.posts_with_tag("2021")) == ["c", "e"]
+    assert ids(blog_index.posts_with_tag("2022")) == []
+    assert {tag.id for tag in blog_index.remove_unused_tags()} == {"2022"}
+
+
+def test_replaced_post_keeps_its_place(blog_index):
+    add_posts(blog_index)
+    blog_index.add_post(make_post("a", date(2021, 3, 1), ["python", "go"]))
+    assert ids(blog_index.sorted_posts()) == ["b", "a", "c", "e", "d"]
+
+
+def test_neighbors(blog_index):
+    add_posts(blog_index)
+    assert blog_index.neighbors("b") == ("a", None)
+    assert blog_index.neighbors("a") == ("c", "b")
+    assert blog_index.neighbors("c") == ("e", "a")
+    assert blog_index.neighbors("e") == ("d", "c")
+    assert blog_index.neighbors("d") == (None, "e")
+    assert blog_index.neighbors("unknown") == (None, None)
+
+
+def test_to_json_round_trip(blog_index):
+    add_posts(blog_index)
+    blog_index.to_json()
+    loaded = BlogIndex.from_json(blog_index.blog_index_path)
+    assert ids(loaded.sorted_posts()) == ids(blog_index.sorted_posts())
+    assert loaded.tags == blog_index.tags
+
+
+def test_years_and_months(blog_index):
+    add_posts(blog_index)
+    assert blog_index.years() == [2020, 2021, 2022]
+    assert blog_index.months() == [(2020, 7), (2021, 3), (2022, 1)]
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({}, ["b", "a", "c", "e", "d"]),
+        ({"tag": "python"}, ["b", "a", "e"]),
+        ({"tag": "2021"}, ["a", "c", "e"]),
+        ({"year": 2021}, ["a", "c", "e"]),
+        ({"year": 2021, "month": 3}, ["a", "c", "e"]),
+        ({"year": 2021, "month": 4}, []),
+        ({"month": 1}, ["b"]),
+        ({"start": date(2021, 3, 1)}, ["b", "a", "c", "e"]),
+        ({"end": date(2021, 3, 1)}, ["a", "c", "e", "d"]),
+        ({"start": date(2021, 3, 2), "end": date(2022, 1, 4)}, []),
+        ({"archived": True}, ["c"]),
+        ({"tag": "python", "year": 2021}, ["a", "e"]),
+        ({"tag": "rust", "archived": False}, ["b"]),
+        (
+            {"tag": "python", "start": date(2021, 1, 1), "end": date(2021, 12, 31)},
+            ["a", "e"],
+        ),
+        ({"tag": "unknown"}, []),
+    ],
+)
+def test_query(blog_index, filters, expected):
+    add_posts(blog_index)
+    assert ids(blog_index.query(**filters)) == expected
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pygments
+import pytest
+
+from blogger import markdown2
+from blogger.cache import DiskCache
+from blogger.render import markdown_converter
+from blogger.utils import MARKDOWN_EXTRAS
+
+# the golden html was converted by markdown2 before placeholders were restored
+# in a single pass, numbered by a counter and converters and formatters reused
+GOLDEN_PATH = Path(__file__).resolve().parent / "data" / "markdown2"
+# the golden code blocks were highlighted by this pygments version
+GOLDEN_PYGMENTS_VERSION = "2.19.2"
+
+CASES = sorted(path.stem for path in GOLDEN_PATH.glob("*.md"))
+
+
+def read_case(name: str):
+    markdown = (GOLDEN_PATH / f"{name}.md").read_text()
+    html = (GOLDEN_PATH / f"{name}.html").read_text()
+    if name == "code_blocks" and pygments.__version__ != GOLDEN_PYGMENTS_VERSION:
+        pytest.skip(f"golden code blocks need pygments {GOLDEN_PYGMENTS_VERSION}")
+    return markdown, html
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_matches_golden(name):
+    markdown, html = read_case(name)
+    assert markdown2.markdown(markdown, extras=MARKDOWN_EXTRAS) == html
+
+
+def test_reused_converter_matches_golden():
+    converter = markdown2.Markdown(extras=MARKDOWN_EXTRAS)
+    # every post is converted after a different one, so state left over
+    # from the previous conversion would show
+    for name in CASES + CASES[::-1]:
+        markdown, html = read_case(name)
+        assert converter.convert(markdown) == html, name
+
+
+def test_render_converter_is_reused():
+    extras = tuple(MARKDOWN_EXTRAS)
+    assert markdown_converter(extras) is markdown_converter(extras)
+
+
+def test_placeholder_prefix_in_text(monkeypatch):
+    # the converter is created with prefix 0, which the text contains as a
+    # literal placeholder, so the conversion has to draw another one
+    prefixes = iter([0, 0, 1])
+    monkeypatch.setattr(markdown2, "getrandbits", lambda bits: next(prefixes))
+    markdown, html = read_case("literal_placeholders")
+    assert "md5-" + "0" * 32 in markdown
+    converter = markdown2.Markdown(extras=MARKDOWN_EXTRAS)
+    assert converter.convert(markdown) == html
+    assert converter._placeholder_prefix == "%016x" % 1
+
+
+def test_highlight_cache_matches_golden(tmp_path):
+    markdown, html = read_case("code_blocks")
+    converter = markdown2.Markdown(extras=MARKDOWN_EXTRAS)
+    converter.highlight_cache = DiskCache(tmp_path, None)
+    assert converter.convert(markdown) == html
+    misses = converter.highlight_cache.misses
+    assert misses > 0
+
+    assert converter.convert(markdown) == html
+    assert converter.highlight_cache.hits == misses
+    assert converter.highlight_cache.misses == misses
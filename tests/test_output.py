@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+from blogger.blog import Blog
+from blogger.conf import BlogConfig
+from blogger.output import OutputWriter
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+
+
+def test_write_skips_unchanged_content(tmp_path):
+    output = OutputWriter(tmp_path, {})
+    output.write(tmp_path / "a" / "index.html", "one")
+    output.write(tmp_path / "a" / "index.html", "one")
+    output.write(tmp_path / "a" / "index.html", "two")
+    assert (tmp_path / "a" / "index.html").read_text() == "two"
+    assert (output.written, output.skipped) == (2, 1)
+
+
+def test_remove_stale(tmp_path):
+    hashes = {}
+    output = OutputWriter(tmp_path, hashes)
+    output.write(tmp_path / "posts" / "a" / "index.html", "a")
+    output.write(tmp_path / "posts" / "b" / "index.html", "b")
+    output.write(tmp_path / "index.html", "index")
+    (tmp_path / "CNAME").write_text("not written by a build")
+
+    # the next build keeps a, writes the index again and no longer produces b
+    output = OutputWriter(tmp_path, hashes)
+    output.keep(tmp_path / "posts" / "a" / "index.html")
+    output.write(tmp_path / "index.html", "index")
+    output.remove_stale()
+
+    assert (tmp_path / "posts" / "a" / "index.html").exists()
+    assert not (tmp_path / "posts" / "b").exists()
+    assert (tmp_path / "CNAME").exists()
+    assert set(hashes) == {"posts/a/index.html", "index.html"}
+    assert output.deleted == 1
+
+
+def test_remove_stale_forgets_missing_files(tmp_path):
+    hashes = {"gone.html": "hash"}
+    output = OutputWriter(tmp_path, hashes)
+    output.remove_stale()
+    assert hashes == {}
+    assert output.deleted == 0
+
+
+def write_post(blog_in_path: Path, post_id: str, tags: str):
+    (blog_in_path / f"{post_id}.md").write_text(
+        f"---\nblog-title: {post_id}\nblog-date: 2020-01-01\nblog-tags: [{tags}]\n---\n"
+        f"Post {post_id}.\n"
+    )
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    # templates are read relative to the working directory
+    monkeypatch.chdir(REPO_PATH)
+    (tmp_path / "in").mkdir()
+    return BlogConfig.from_dict(
+        {
+            "blog_in_path": tmp_path / "in",
+            "blog_out_path": tmp_path / "out",
+            "tags_path": "tags",
+            "posts_path": "posts",
+            "blog_index_path": tmp_path / "out" / "blog_index.json",
+            "use_cache": False,
+        }
+    )
+
+
+def test_build_removes_outputs_of_removed_posts(config):
+    write_post(config.blog_in_path, "a", "python")
+    write_post(config.blog_in_path, "b", "python, rust")
+    Blog(config=config).update()
+    out = config.blog_out_path
+    assert (out / "posts" / "b" / "index.html").exists()
+    assert (out / "tags" / "rust" / "index.html").exists()
+
+    (config.blog_in_path / "b.md").unlink()
+    Blog(config=config).update()
+    assert not (out / "posts" / "b").exists()
+    assert not (out / "tags" / "rust").exists()
+    assert (out / "posts" / "a" / "index.html").exists()
+    assert (out / "tags" / "python" / "index.html").exists()
+    tag_page = (out / "tags" / "python" / "index.html").read_text()
+    assert "/blog/posts/a" in tag_page
+    assert "/blog/posts/b" not in tag_page
@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from blogger.blog import Blog
+from blogger.conf import BlogConfig
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+
+
+class Interrupted(Exception):
+    pass
+
+
+def write_post(blog_in_path: Path, index: int, title: str):
+    (blog_in_path / f"p{index:02d}.md").write_text(
+        f"---\nblog-title: {title}\nblog-date: 2020-01-{index + 1:02d}\n---\n"
+        f"Post number {index}.\n"
+    )
+
+
+def config(tmp_path: Path, out: str) -> BlogConfig:
+    return BlogConfig.from_dict(
+        {
+            "blog_in_path": tmp_path / "in",
+            "blog_out_path": tmp_path / out,
+            "tags_path": "tags",
+            "posts_path": "posts",
+            "blog_index_path": tmp_path / out / "blog_index.json",
+            "use_cache": False,
+            "checkpoint_interval": 0,
+        }
+    )
+
+
+def interrupt_writes(blog: Blog, post_ids):
+    write = blog.output.write
+
+    def interrupted_write(path: Path, content: str | bytes):
+        if path.parent.name in post_ids:
+            raise Interrupted()
+        write(path, content)
+
+    blog.output.write = interrupted_write
+
+
+@pytest.fixture
+def blog_in_path(tmp_path, monkeypatch):
+    # templates are read relative to the working directory
+    monkeypatch.chdir(REPO_PATH)
+    (tmp_path / "in").mkdir()
+    for i in range(10):
+        write_post(tmp_path / "in", i, f"Post {i}")
+    return tmp_path / "in"
+
+
+def test_resume_renders_pending_navigation(tmp_path, blog_in_path):
+    Blog(config=config(tmp_path, "out")).update()
+    write_post(blog_in_path, 5, "Retitled")
+
+    # interrupt the build while the navigation of the neighbors is rendered
+    blog = Blog(config=config(tmp_path, "out"))
+    interrupt_writes(blog, ("p04", "p06"))
+    with pytest.raises(Interrupted):
+        blog.update()
+
+    Blog(config=config(tmp_path, "out")).update()
+    Blog(config=config(tmp_path, "fresh")).update()
+    for post_id in ("p04", "p05", "p06"):
+        page = Path("posts", post_id, "index.html")
+        resumed = (tmp_path / "out" / page).read_text()
+        assert resumed == (tmp_path / "fresh" / page).read_text()
+        if post_id != "p05":
+            assert "Retitled" in resumed
+
+
+def test_resume_after_torn_journal_line(tmp_path, blog_in_path):
+    Blog(config=config(tmp_path, "out")).update()
+    write_post(blog_in_path, 5, "Retitled")
+
+    blog = Blog(config=config(tmp_path, "out"))
+    interrupt_writes(blog, ("p04", "p06"))
+    with pytest.raises(Interrupted):
+        blog.update()
+    # the process died while it wrote the next entry
+    with open(blog.config.journal_path, "a") as f:
+        f.write('{"title": "torn')
+
+    # entries of the resumed build must not be appended to the torn line
+    blog = Blog(config=config(tmp_path, "out"))
+    interrupt_writes(blog, ("p06",))
+    with pytest.raises(Interrupted):
+        blog.update()
+    journaled = [post_data["id"] for post_data in blog.journal.replay()]
+    assert "p04" in journaled
+    assert journaled == [
+        json.loads(line)["id"]
+        for line in blog.config.journal_path.read_text().splitlines()
+    ]
+
+    Blog(config=config(tmp_path, "out")).update()
+    Blog(config=config(tmp_path, "fresh")).update()
+    for post_id in ("p04", "p05", "p06"):
+        page = Path("posts", post_id, "index.html")
+        resumed = (tmp_path / "out" / page).read_text()
+        assert resumed == (tmp_path / "fresh" / page).read_text()